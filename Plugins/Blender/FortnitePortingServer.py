@@ -1,14 +1,22 @@
+import asyncio
 import bpy
+import collections
+import itertools
 import json
+import mmap
 import os
+import queue
 import socket
+import struct
 import threading
+import time
 import re
 import traceback
+import zlib
 from math import radians
 from enum import Enum
 from mathutils import Matrix, Vector, Euler
-from io_import_scene_unreal_psa_psk_280 import pskimport, psaimport
+from io_import_scene_unreal_psa_psk_280 import pskimport, psaimport, psaimport_armatures
 
 bl_info = {
     "name": "Fortnite Porting",
@@ -23,6 +31,7 @@ global import_assets_root
 global import_settings
 
 global server
+global scheduler
 
 class RigType(Enum):
     DEFAULT = 0
@@ -47,49 +56,1112 @@ class Log:
         print(f"{Log.WARNING}[ERROR] {Log.RESET}{message}")
 
 
+SERVER_HOST = "localhost"
+SERVER_PORT = 24280
+
+CLIENT_MESSAGE_FINISHED = b"FPClientMessageFinished"
+CLIENT_CHECK_SERVER = b"FPClientCheckServer"
+CLIENT_QUEUE_STATUS = b"FPClientQueueStatus"
+CLIENT_CANCEL_IMPORT = b"FPClientCancelImport"
+CLIENT_MAPPED_FILE = b"FPClientMappedFile"
+SERVER_RECEIVED = b"FPServerReceived"
+SERVER_BUSY = b"FPServerBusy"
+SERVER_ERROR = b"FPServerError"
+SERVER_PROGRESS = b"FPServerProgress"
+SERVER_FINISHED = b"FPServerFinished"
+SERVER_QUEUE_STATUS = b"FPServerQueueStatus"
+
+# Payload features advertised to clients that send FPClientCheckServer:<features>, plain FPClientCheckServer gets the legacy reply
+SERVER_CAPABILITIES = ("json", "binary", "zlib", "mmap", "progress", *(("shm",) if os.name == "nt" else ()))
+BINARY_MAGIC = b"FPB\x01"
+# zlib streams are flagged with FRAME_COMPRESSED over TCP and prefixed with COMPRESSED_MAGIC over UDP
+COMPRESSED_MAGIC = b"FPZ\x01"
+MAX_DECOMPRESSED_SIZE = 1024 * 1024 * 1024
+
+# TCP frames: Magic, Flags (FRAME_COMPRESSED), Payload Length
+FRAME_HEADER = struct.Struct("<2sBI")
+FRAME_MAGIC = b"FP"
+FRAME_COMPRESSED = 0x01
+MAX_FRAME_SIZE = 1024 * 1024 * 1024
+# also how long a UDP client may go quiet in the middle of a payload before it is dropped
+STREAM_TIMEOUT = 10.0
+SESSION_SWEEP_INTERVAL = 1.0
+DATAGRAM_RECEIVE_BUFFER = 8 * 1024 * 1024
+# frames up to this size are read whole and checked for control messages, FPClientMappedFile carries a path
+MAX_CONTROL_SIZE = 1024
+STREAM_CHUNK_SIZE = 256 * 1024
+
+# Start importing Data entries while the rest of the payload is still being received
+STREAM_IMPORTS = True
+
+# Requests beyond this are answered with FPServerBusy instead of being queued
+MAX_QUEUED_IMPORTS = 16
+WAIT_TIME_HISTORY = 64
+
+# Capture files: CAPTURE_MAGIC, then every accepted request as CAPTURE_RECORD followed by its raw payload,
+# the record holds the arrival and completion time (unix seconds), CAPTURE_COMPRESSED and the payload length
+CAPTURE_MAGIC = b"FPCAP\x01"
+CAPTURE_RECORD = struct.Struct("<ddBI")
+CAPTURE_COMPRESSED = 0x01
+
+# Seconds of import work done per timer tick before control is handed back to Blender
+IMPORT_TIME_BUDGET = 0.03
+IMPORT_WAIT = object()
+
+
+class ImportStream:
+    """Import payload that is handed to Blender while it is still being received"""
+
+    def __init__(self):
+        self.response = {}
+        self.entries = queue.Queue()
+        self.ready = False
+        self.finished = False
+        self.error = None
+
+    def next_entry(self):
+        try:
+            return self.entries.get_nowait()
+        except queue.Empty:
+            return None
+
+    def is_done(self):
+        return self.finished and self.entries.empty()
+
+    def fail(self, error):
+        self.error = error
+        self.ready = True
+        self.finished = True
+
+
+class ImportStreamParser:
+    """Parses an import payload incrementally, queueing each element of Data as soon as it is complete
+
+    The structure is scanned on the raw bytes, which is safe because UTF-8 never uses ASCII bytes inside
+    multibyte characters, only complete values are decoded."""
+
+    STRING = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"')
+    SKIP = re.compile(rb'(?:[^"\[\]{}]+|"[^"\\]*(?:\\.[^"\\]*)*")*')
+    LITERAL = re.compile(rb'[^\s,\]}]+')
+    SEPARATOR = re.compile(rb'[\s,]*')
+    COLON = re.compile(rb'\s*:')
+
+    HEADER_KEYS = {"AssetsRoot", "Settings"}
+
+    def __init__(self, stream, streaming=STREAM_IMPORTS):
+        self.stream = stream
+        self.streaming = streaming
+        self.chunks = []
+        self.buffer = bytearray()
+        self.position = 0
+        self.state = "Start"
+        self.key = None
+        self.scan_position = None
+        self.depth = 0
+
+    def feed(self, data):
+        if self.stream.finished:
+            return
+
+        if not self.streaming:
+            self.chunks.append(bytes(data))
+            return
+
+        try:
+            self.append(data)
+            self.parse()
+        except (ValueError, UnicodeDecodeError) as e:
+            self.stream.fail(str(e))
+
+    def finish(self):
+        if self.stream.finished:
+            return
+
+        if not self.streaming:
+            try:
+                response = json.loads(b"".join(self.chunks))
+            except (ValueError, UnicodeDecodeError) as e:
+                self.stream.fail(str(e))
+                return
+
+            self.stream.response = {key: value for key, value in response.items() if key != "Data"}
+            for entry in response.get("Data") or []:
+                self.stream.entries.put(entry)
+            self.stream.ready = True
+            self.stream.finished = True
+            return
+
+        try:
+            self.parse(final=True)
+        except (ValueError, UnicodeDecodeError) as e:
+            self.stream.fail(str(e))
+            return
+
+        if self.state != "Done":
+            self.stream.fail(f"Import payload ended unexpectedly while reading {self.state}")
+            return
+
+        self.stream.ready = True
+        self.stream.finished = True
+
+    # drop everything that was already parsed so the buffer only holds the pending value,
+    # in place so a value arriving in many small pieces isn't copied again for every one of them
+    def append(self, data):
+        if self.position:
+            if self.scan_position is not None:
+                self.scan_position -= self.position
+            del self.buffer[:self.position]
+            self.position = 0
+        self.buffer += data
+
+    def parse(self, final=False):
+        while True:
+            self.position = self.SEPARATOR.match(self.buffer, self.position).end()
+            if self.position >= len(self.buffer):
+                return
+
+            char = chr(self.buffer[self.position])
+            if self.state == "Start":
+                if char != "{":
+                    raise ValueError("Import payload is not a JSON object")
+                self.position += 1
+                self.state = "Key"
+
+            elif self.state == "Key":
+                if char == "}":
+                    self.position += 1
+                    self.state = "Done"
+                    continue
+
+                if char != '"':
+                    raise ValueError(f"Expected property name, found {char!r}")
+
+                if (match := self.STRING.match(self.buffer, self.position)) is None:
+                    return
+
+                if (colon := self.COLON.match(self.buffer, match.end())) is None:
+                    if self.buffer[match.end():].strip():
+                        raise ValueError(f"Expected ':' after property {match.group().decode('utf-8', 'replace')}")
+                    return
+
+                self.key = json.loads(match.group())
+                self.position = colon.end()
+                self.state = "Value"
+
+            elif self.state == "Value":
+                if self.key == "Data" and char == "[":
+                    self.position += 1
+                    self.state = "Data"
+                    self.stream.ready = self.HEADER_KEYS.issubset(self.stream.response)
+                    continue
+
+                if (end := self.scan_value(final)) is None:
+                    return
+
+                self.stream.response[self.key] = json.loads(self.buffer[self.position:end])
+                self.position = end
+                self.state = "Key"
+
+            elif self.state == "Data":
+                if char == "]":
+                    self.position += 1
+                    self.state = "Key"
+                    continue
+
+                if (end := self.scan_value(final)) is None:
+                    return
+
+                self.stream.entries.put(json.loads(self.buffer[self.position:end]))
+                self.position = end
+
+            else:
+                raise ValueError(f"Unexpected {char!r} after the end of the import payload")
+
+    # find where the value at the current position ends without decoding it, None if it is still incomplete
+    def scan_value(self, final):
+        char = chr(self.buffer[self.position])
+        if char == '"':
+            match = self.STRING.match(self.buffer, self.position)
+            return match.end() if match else None
+
+        if char not in "{[":
+            if (match := self.LITERAL.match(self.buffer, self.position)) is None:
+                raise ValueError(f"Expected value, found {char!r}")
+            if match.end() == len(self.buffer) and not final:
+                return None
+            return match.end()
+
+        if self.scan_position is None:
+            self.scan_position = self.position
+            self.depth = 0
+
+        # the regex skips over strings and plain values so only brackets are counted here
+        position = self.scan_position
+        while True:
+            position = self.SKIP.match(self.buffer, position).end()
+            if position >= len(self.buffer) or self.buffer[position] == ord('"'):
+                # resume at the start of an incomplete string once more data arrives
+                self.scan_position = position
+                return None
+
+            if self.buffer[position] in b"{[":
+                self.depth += 1
+            else:
+                self.depth -= 1
+
+            position += 1
+            if self.depth == 0:
+                self.scan_position = None
+                return position
+
+
+class BinaryDecoder:
+    """Decodes values of the compact binary payload format
+
+    Every value starts with a one byte tag. Strings are interned, the first occurrence
+    carries the text and every later one is an index into the table shared by the whole payload."""
+
+    NONE, FALSE, TRUE, INT, FLOAT, STRING, STRING_REF, LIST, DICT = range(9)
+
+    LENGTH = struct.Struct("<I")
+    INT_VALUE = struct.Struct("<q")
+    FLOAT_VALUE = struct.Struct("<d")
+
+    def __init__(self):
+        self.strings = []
+        self.read = self.create_reader(self.strings)
+
+    def decode(self, data):
+        value, offset = self.read(data, 0)
+        if offset != len(data):
+            raise ValueError(f"Unexpected data after binary value ({len(data) - offset} bytes)")
+        return value
+
+    # closure so the recursive calls only touch locals, this is the hot path for large payloads
+    @classmethod
+    def create_reader(cls, strings):
+        unpack_length = cls.LENGTH.unpack_from
+        unpack_int = cls.INT_VALUE.unpack_from
+        unpack_float = cls.FLOAT_VALUE.unpack_from
+        NONE, FALSE, TRUE, INT, FLOAT = cls.NONE, cls.FALSE, cls.TRUE, cls.INT, cls.FLOAT
+        STRING, STRING_REF, LIST, DICT = cls.STRING, cls.STRING_REF, cls.LIST, cls.DICT
+
+        def read(data, offset):
+            tag = data[offset]
+            offset += 1
+
+            if tag == STRING_REF:
+                return strings[unpack_length(data, offset)[0]], offset + 4
+
+            if tag == STRING:
+                length, = unpack_length(data, offset)
+                offset += 4
+                string = data[offset:offset + length].decode('utf-8')
+                strings.append(string)
+                return string, offset + length
+
+            if tag == DICT:
+                count, = unpack_length(data, offset)
+                offset += 4
+                value = {}
+                for _ in range(count):
+                    key, offset = read(data, offset)
+                    if type(key) is not str:
+                        raise ValueError(f"Object key is a {type(key).__name__}, not a string")
+                    value[key], offset = read(data, offset)
+                return value, offset
+
+            if tag == LIST:
+                count, = unpack_length(data, offset)
+                offset += 4
+                value = []
+                append = value.append
+                for _ in range(count):
+                    item, offset = read(data, offset)
+                    append(item)
+                return value, offset
+
+            if tag == FLOAT:
+                return unpack_float(data, offset)[0], offset + 8
+
+            if tag == INT:
+                return unpack_int(data, offset)[0], offset + 8
+
+            if tag == NONE:
+                return None, offset
+
+            if tag == FALSE:
+                return False, offset
+
+            if tag == TRUE:
+                return True, offset
+
+            raise ValueError(f"Unknown binary value tag {tag}")
+
+        return read
+
+
+class BinaryEncoder:
+    """Reference encoder for the compact binary payload format, see BinaryDecoder"""
+
+    def __init__(self):
+        self.strings = {}
+
+    # BINARY_MAGIC, then one length-prefixed record for the header and one for every element of Data
+    def encode_payload(self, response):
+        header = {key: value for key, value in response.items() if key != "Data"}
+        records = [header, *(response.get("Data") or [])]
+
+        payload = bytearray(BINARY_MAGIC)
+        for record in records:
+            data = bytearray()
+            self.write(data, record)
+            payload += BinaryDecoder.LENGTH.pack(len(data))
+            payload += data
+        return bytes(payload)
+
+    def write(self, data, value):
+        if value is None:
+            data.append(BinaryDecoder.NONE)
+        elif value is True:
+            data.append(BinaryDecoder.TRUE)
+        elif value is False:
+            data.append(BinaryDecoder.FALSE)
+        elif isinstance(value, int):
+            data.append(BinaryDecoder.INT)
+            data += BinaryDecoder.INT_VALUE.pack(value)
+        elif isinstance(value, float):
+            data.append(BinaryDecoder.FLOAT)
+            data += BinaryDecoder.FLOAT_VALUE.pack(value)
+        elif isinstance(value, str):
+            if (index := self.strings.get(value)) is not None:
+                data.append(BinaryDecoder.STRING_REF)
+                data += BinaryDecoder.LENGTH.pack(index)
+                return
+
+            self.strings[value] = len(self.strings)
+            encoded = value.encode('utf-8')
+            data.append(BinaryDecoder.STRING)
+            data += BinaryDecoder.LENGTH.pack(len(encoded))
+            data += encoded
+        elif isinstance(value, dict):
+            data.append(BinaryDecoder.DICT)
+            data += BinaryDecoder.LENGTH.pack(len(value))
+            for key, item in value.items():
+                self.write(data, str(key))
+                self.write(data, item)
+        elif isinstance(value, (list, tuple)):
+            data.append(BinaryDecoder.LIST)
+            data += BinaryDecoder.LENGTH.pack(len(value))
+            for item in value:
+                self.write(data, item)
+        else:
+            raise TypeError(f"Cannot encode {type(value).__name__} in a binary payload")
+
+
+class BinaryStreamParser:
+    """Parses a binary import payload, queueing each element of Data as soon as its record is complete"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.decoder = BinaryDecoder()
+        self.buffer = bytearray()
+        self.position = 0
+        self.records = 0
+
+    def feed(self, data):
+        if self.stream.finished:
+            return
+
+        self.buffer += data
+        try:
+            self.parse()
+        except (ValueError, IndexError, struct.error, UnicodeDecodeError, RecursionError) as e:
+            self.stream.fail(f"Invalid binary payload: {e}")
+
+    def finish(self):
+        if self.stream.finished:
+            return
+
+        if self.position != len(self.buffer) or self.records == 0:
+            self.stream.fail("Binary payload ended unexpectedly")
+            return
+
+        self.stream.ready = True
+        self.stream.finished = True
+
+    def parse(self):
+        length_size = BinaryDecoder.LENGTH.size
+        while len(self.buffer) - self.position >= length_size:
+            length, = BinaryDecoder.LENGTH.unpack_from(self.buffer, self.position)
+            start = self.position + length_size
+            if len(self.buffer) - start < length:
+                break
+
+            record = self.decoder.decode(bytes(self.buffer[start:start + length]))
+            if self.records == 0:
+                if not isinstance(record, dict):
+                    raise ValueError("Import payload header is not an object")
+                self.stream.response = record
+                self.stream.ready = True
+            else:
+                self.stream.entries.put(record)
+
+            self.records += 1
+            self.position = start + length
+
+        # drop the records that were already decoded so the buffer only holds the pending one
+        if self.position:
+            del self.buffer[:self.position]
+            self.position = 0
+
+
+class PayloadParser:
+    """Picks the parser for an import payload from its first bytes, inflating it first if it is compressed"""
+
+    MAGIC_SIZE = 4
+
+    def __init__(self, stream, compressed=False):
+        self.stream = stream
+        self.parser = None
+        self.pending = bytearray()
+        self.decompressor = zlib.decompressobj() if compressed else None
+        self.check_compressed = not compressed
+        self.decompressed_size = 0
+
+    def feed(self, data):
+        if self.stream.finished:
+            return
+
+        if self.decompressor is not None:
+            try:
+                data = self.decompressor.decompress(data)
+            except zlib.error as e:
+                self.stream.fail(f"Invalid compressed payload: {e}")
+                return
+
+            self.decompressed_size += len(data)
+            if self.decompressed_size > MAX_DECOMPRESSED_SIZE:
+                self.stream.fail(f"Compressed payload inflates past {MAX_DECOMPRESSED_SIZE} bytes")
+                return
+
+        if self.parser is None:
+            self.pending += data
+            if len(self.pending) < self.MAGIC_SIZE and self.is_magic_prefix():
+                return
+            self.select()
+            return
+
+        self.parser.feed(data)
+
+    def finish(self):
+        if self.stream.finished:
+            return
+
+        if self.decompressor is not None:
+            try:
+                data = self.decompressor.flush()
+            except zlib.error as e:
+                self.stream.fail(f"Invalid compressed payload: {e}")
+                return
+
+            if not self.decompressor.eof:
+                self.stream.fail("Compressed payload ended unexpectedly")
+                return
+
+            self.decompressor = None
+            self.feed(data)
+
+        if self.parser is None:
+            self.select()
+            if self.parser is None:
+                self.stream.fail("Compressed payload is empty")
+                return
+
+        self.parser.finish()
+
+    def is_magic_prefix(self):
+        if BINARY_MAGIC.startswith(self.pending):
+            return True
+        return self.check_compressed and COMPRESSED_MAGIC.startswith(self.pending)
+
+    def select(self):
+        data, self.pending = self.pending, bytearray()
+        if self.check_compressed:
+            self.check_compressed = False
+            if data.startswith(COMPRESSED_MAGIC):
+                self.decompressor = zlib.decompressobj()
+                self.feed(data[self.MAGIC_SIZE:])
+                return
+
+        if data.startswith(BINARY_MAGIC):
+            self.parser = BinaryStreamParser(self.stream)
+            data = data[len(BINARY_MAGIC):]
+        else:
+            self.parser = ImportStreamParser(self.stream)
+
+        if data:
+            self.parser.feed(data)
+
+
+class ImportJob:
+    """Single import request, queued as soon as its first bytes arrive"""
+
+    def __init__(self, request_id, compressed=False, reply=None, recorder=None):
+        self.request_id = request_id
+        self.stream = ImportStream()
+        self.parser = PayloadParser(self.stream, compressed)
+        self.compressed = compressed
+        self.reply = reply
+        self.recorder = recorder
+        self.capture = [] if recorder is not None else None
+        self.arrival_time = time.time()
+        self.queued_time = time.perf_counter()
+        self.started_time = None
+        self.cancelled = False
+
+    # the parsers fail the stream on malformed payloads, anything else they raise must not leave the job waiting
+    def feed(self, data):
+        if self.capture is not None:
+            self.capture.append(bytes(data))
+        try:
+            self.parser.feed(data)
+        except Exception as e:
+            self.stream.fail(f"Invalid import payload: {type(e).__name__}: {e}")
+
+    def finish(self):
+        try:
+            self.parser.finish()
+        except Exception as e:
+            self.stream.fail(f"Invalid import payload: {type(e).__name__}: {e}")
+
+        if self.recorder is not None:
+            self.recorder.write(self)
+            self.capture = None
+
+    # fail a job whose payload stopped arriving, the import would wait for the rest of it forever
+    def abort(self, error):
+        if not self.stream.finished:
+            self.stream.fail(error)
+
+    def wait_time(self):
+        return (self.started_time or time.perf_counter()) - self.queued_time
+
+    def elapsed_time(self):
+        return time.perf_counter() - (self.started_time or self.queued_time)
+
+    # FPServerProgress:{"RequestId", "Stage", ...}, only sent to clients that asked for progress in the server check
+    def report_progress(self, stage, **values):
+        self.send_report(SERVER_PROGRESS, {"RequestId": self.request_id, "Stage": stage, **values})
+
+    # FPServerFinished:{"RequestId", "Success", "Cancelled", "Error", "Elapsed"}
+    def report_finished(self, error=None):
+        self.send_report(SERVER_FINISHED, {
+            "RequestId": self.request_id,
+            "Success": error is None and not self.cancelled,
+            "Cancelled": self.cancelled,
+            "Error": error,
+            "Elapsed": round(self.elapsed_time(), 4)
+        })
+
+    def send_report(self, message, values):
+        if self.reply is None:
+            return
+
+        try:
+            self.reply(message + b":" + json.dumps(values).encode('utf-8'))
+        except OSError as e:
+            Log.warning(f"Stopped sending progress for Import Request {self.request_id}: {e}")
+            self.reply = None
+
+
+class ImportQueue:
+    """Bounded FIFO of import jobs handed from the server thread to the Blender timer"""
+
+    def __init__(self, capacity=MAX_QUEUED_IMPORTS):
+        self.capacity = capacity
+        self.jobs = queue.Queue(capacity)
+        self.wait_times = collections.deque(maxlen=WAIT_TIME_HISTORY)
+        self.lock = threading.Lock()
+        self.active_job = None
+
+    def put(self, job):
+        try:
+            self.jobs.put_nowait(job)
+            return True
+        except queue.Full:
+            return False
+
+    def get(self):
+        try:
+            job = self.jobs.get_nowait()
+        except queue.Empty:
+            return None
+
+        job.started_time = time.perf_counter()
+        with self.lock:
+            self.wait_times.append(job.wait_time())
+        self.active_job = job
+        return job
+
+    def depth(self):
+        return self.jobs.qsize()
+
+    def statistics(self):
+        with self.lock:
+            wait_times = list(self.wait_times)
+
+        return {
+            "Queued": self.depth(),
+            "Capacity": self.capacity,
+            "LastWait": wait_times[-1] if wait_times else 0.0,
+            "AverageWait": sum(wait_times) / len(wait_times) if wait_times else 0.0,
+            "MaxWait": max(wait_times, default=0.0)
+        }
+
+
+class ImportScheduler:
+    """Steps through an import job on the Blender timer, doing at most one time budget of work per tick"""
+
+    def __init__(self, import_queue, time_budget=IMPORT_TIME_BUDGET):
+        self.import_queue = import_queue
+        self.time_budget = time_budget
+        self.job = None
+        self.task = None
+
+    def is_busy(self):
+        return self.task is not None
+
+    def start(self, job):
+        self.job = job
+        self.task = import_job(job)
+        Log.information(f"Starting Import Request {job.request_id} after waiting {job.wait_time():.2f}s ({self.import_queue.depth()} queued)")
+        job.report_progress("Started", Waited=round(job.wait_time(), 4))
+
+    # safe to call from any thread, the job stops at its next step
+    def cancel(self):
+        if (job := self.import_queue.active_job) is not None:
+            job.cancelled = True
+
+    def tick(self):
+        if self.job.cancelled:
+            self.task.close()
+            Log.warning(f"Cancelled Import Request {self.job.request_id}")
+            self.finish()
+            return
+
+        tick_start = time.perf_counter()
+        try:
+            while time.perf_counter() - tick_start < self.time_budget:
+                if next(self.task) is IMPORT_WAIT:
+                    break
+        except StopIteration:
+            Log.information(f"Finished Import Request {self.job.request_id} in {self.job.elapsed_time():.2f}s")
+            self.finish(self.job.stream.error)
+        except Exception as e:
+            error_str = str(e)
+            Log.error(f"An unhandled error occurred:")
+            traceback.print_exc()
+            message_box(error_str, "An unhandled error occurred", "ERROR")
+            self.finish(error_str)
+
+    def finish(self, error=None):
+        self.job.report_finished(error)
+        self.import_queue.active_job = None
+        self.job = None
+        self.task = None
+
+
+class RequestRecorder:
+    """Appends every accepted import payload to a capture file that FortnitePortingReplay.py can play back"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = open(path, "ab")
+        if self.file.tell() == 0:
+            self.file.write(CAPTURE_MAGIC)
+
+    # called from the server loop and the mapped file workers
+    def write(self, job):
+        payload = b"".join(job.capture)
+        flags = CAPTURE_COMPRESSED if job.compressed else 0
+        with self.lock:
+            if self.file.closed:
+                return
+            self.file.write(CAPTURE_RECORD.pack(job.arrival_time, time.time(), flags, len(payload)))
+            self.file.write(payload)
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+class DatagramSession:
+    """Reassembly state of one UDP client, so payloads from several exporters do not interleave"""
+
+    def __init__(self):
+        self.job = None
+        self.rejected = False
+        # asked for progress messages in the server check, ends with the session
+        self.progress = False
+        self.last_seen = time.perf_counter()
+
+
+class DatagramProtocol(asyncio.DatagramProtocol):
+
+    def __init__(self, receiver):
+        self.receiver = receiver
+
+    def datagram_received(self, data, sender):
+        self.receiver.receive_datagram(data, sender)
+
+
 class Receiver(threading.Thread):
+    """Runs the UDP and TCP servers on an asyncio loop in its own thread, every client is handled separately"""
 
-    def __init__(self, event):
+    def __init__(self, import_queue, host=SERVER_HOST, port=SERVER_PORT, capture_path=None):
         threading.Thread.__init__(self, daemon=True)
-        self.event = event
-        self.data = None
-        self.socket_server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.import_queue = import_queue
+        self.host = host
+        self.port = port
+        self.capture_path = capture_path
+        self.recorder = None
+        self.request_ids = itertools.count(1)
+        self.loop = asyncio.new_event_loop()
+        self.datagram_transport = None
+        self.datagram_sessions = {}
+        self.stream_server = None
+        self.stream_clients = {}
+        # TCP clients that asked for progress messages, UDP clients keep it in their DatagramSession
+        self.progress_clients = set()
+        self.wake_event = None
         self.keep_alive = True
 
     def run(self):
-        host, port = 'localhost', 24280
-        self.socket_server.bind((host, port))
-        self.socket_server.settimeout(1.0)
-        Log.information(f"FortnitePorting Server Listening at {host}:{port}")
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self.serve())
+        finally:
+            self.loop.close()
+
+    async def serve(self):
+        self.wake_event = asyncio.Event()
+        if self.capture_path:
+            try:
+                self.recorder = RequestRecorder(self.capture_path)
+                Log.information(f"Recording import requests to {self.capture_path}")
+            except OSError as e:
+                Log.error(f"Failed to open capture file {self.capture_path}: {e}")
+
+        try:
+            self.datagram_transport, _ = await self.loop.create_datagram_endpoint(lambda: DatagramProtocol(self), local_addr=(self.host, self.port), family=socket.AF_INET)
+            self.datagram_transport.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, DATAGRAM_RECEIVE_BUFFER)
+
+            # windows lets a second socket take over a port with SO_REUSEADDR, so another instance has to fail instead
+            self.stream_server = await asyncio.start_server(self.receive_stream_client, self.host, self.port, family=socket.AF_INET, reuse_address=os.name != "nt")
+        except OSError as e:
+            Log.error(f"FortnitePorting Server failed to listen at {self.host}:{self.port}: {e}")
+            if self.datagram_transport is not None:
+                self.datagram_transport.close()
+            if self.recorder is not None:
+                self.recorder.close()
+            return
+
+        Log.information(f"FortnitePorting Server Listening at {self.host}:{self.port} (UDP, TCP)")
 
         while self.keep_alive:
-            current_data = ""
             try:
-                data_string = ""
-                while True:
-                    socket_data, sender = self.socket_server.recvfrom(4096)
-                    if data := socket_data.decode('utf-8'):
-                        if data == "FPClientMessageFinished":
-                            break
-                        if data == "FPClientCheckServer":
-                            self.socket_server.sendto("FPServerReceived".encode('utf-8'), sender)
-                            continue
-                        data_string += data
-                current_data = data_string
-                self.data = json.loads(data_string)
-                self.event.set()
-                self.socket_server.sendto("FPServerReceived".encode('utf-8'), sender)
-               
-            except OSError:
-                pass
-            except JSONDecodeError:
-                print(current_data)
-                pass
+                await asyncio.wait_for(self.wake_event.wait(), SESSION_SWEEP_INTERVAL)
+            except asyncio.TimeoutError:
+                self.expire_sessions()
+
+        self.datagram_transport.close()
+        self.stream_server.close()
+        # closing the connections ends their pending reads, so the client tasks finish on their own
+        for writer in self.stream_clients:
+            writer.close()
+        await asyncio.gather(*self.stream_clients.values(), return_exceptions=True)
+        for session in self.datagram_sessions.values():
+            if session.job is not None:
+                session.job.stream.fail("FortnitePorting Server closed before the full payload was received")
+        if self.recorder is not None:
+            self.recorder.close()
+        Log.information("FortnitePorting Server Closed")
+
+    # Legacy UDP mode, payload is spliced into datagrams and terminated by FPClientMessageFinished
+    def receive_datagram(self, socket_data, sender):
+        if socket_data.startswith(CLIENT_MAPPED_FILE):
+            self.loop.create_task(self.reply_mapped_file(socket_data, sender))
+            return
+
+        if (response := self.receive_control(socket_data, sender)) is not None:
+            self.datagram_transport.sendto(response, sender)
+            return
+
+        session = self.datagram_session(sender)
+
+        if socket_data != CLIENT_MESSAGE_FINISHED:
+            # once rejected, the rest of the message is dropped until its terminator
+            if session.job is None and not session.rejected:
+                session.job = self.begin_job(client=sender)
+                session.rejected = session.job is None
+
+            if session.job is not None:
+                session.job.feed(socket_data)
+            return
+
+        if session.rejected:
+            response = self.busy()
+        else:
+            if session.job is not None:
+                session.job.finish()
+            response = self.received(session.job)
+
+        del self.datagram_sessions[sender]
+        self.datagram_transport.sendto(response, sender)
+
+    def datagram_session(self, sender):
+        if (session := self.datagram_sessions.get(sender)) is None:
+            session = self.datagram_sessions[sender] = DatagramSession()
+        session.last_seen = time.perf_counter()
+        return session
+
+    async def reply_mapped_file(self, message, sender):
+        try:
+            response = await self.loop.run_in_executor(None, self.receive_mapped_file, message, sender)
+        except Exception as e:
+            response = self.error(f"Failed to read mapped payload: {e}")
+        # the mapped file was the whole payload, so this ends the session of the server check
+        if (session := self.datagram_sessions.get(sender)) is not None and session.job is None:
+            del self.datagram_sessions[sender]
+        self.datagram_transport.sendto(response, sender)
+
+    # drop UDP clients that stopped sending in the middle of a payload or never sent one after the server check
+    def expire_sessions(self):
+        expire_time = time.perf_counter() - STREAM_TIMEOUT
+        for sender, session in list(self.datagram_sessions.items()):
+            if session.last_seen >= expire_time:
+                continue
+
+            if session.job is not None or session.rejected:
+                Log.warning(f"Dropping incomplete payload from {sender[0]}:{sender[1]}")
+            if session.job is not None:
+                session.job.stream.fail("Client stopped sending before the full payload was received")
+            del self.datagram_sessions[sender]
+
+    # TCP mode, every message is a length-prefixed frame on a persistent connection
+    async def receive_stream_client(self, reader, writer):
+        self.stream_clients[writer] = asyncio.current_task()
+        job = None
+        try:
+            while self.keep_alive:
+                magic, flags, length = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+                if magic != FRAME_MAGIC or length > MAX_FRAME_SIZE:
+                    Log.error("Received invalid frame header, closing connection")
+                    return
+
+                compressed = bool(flags & FRAME_COMPRESSED)
+                if length <= MAX_CONTROL_SIZE:
+                    payload = await asyncio.wait_for(reader.readexactly(length), STREAM_TIMEOUT)
+                    if payload == CLIENT_MESSAGE_FINISHED:
+                        continue
+
+                    if payload.startswith(CLIENT_MAPPED_FILE):
+                        response = await self.loop.run_in_executor(None, self.receive_mapped_file, payload, writer)
+                    elif (response := self.receive_control(payload, writer)) is None:
+                        if (job := self.begin_job(compressed, writer)) is None:
+                            response = self.busy()
+                        else:
+                            job.feed(payload)
+                            job.finish()
+                            response = self.received(job)
+
+                    self.send_frame(writer, response)
+                    continue
+
+                job = self.begin_job(compressed, writer)
+                await self.receive_stream(reader, length, job)
+                self.send_frame(writer, self.received(job) if job is not None else self.busy())
+        except asyncio.IncompleteReadError as e:
+            if e.partial:
+                Log.error(f"Connection closed before the full frame was received ({e.expected} bytes expected)")
+        except (asyncio.TimeoutError, OSError):
+            Log.error("Connection timed out or was reset, closing connection")
+        finally:
+            if job is not None:
+                job.abort("Connection closed before the full payload was received")
+            self.stream_clients.pop(writer, None)
+            self.progress_clients.discard(writer)
+            writer.close()
+
+    # feed the payload to the parser as it arrives, rejected jobs are drained
+    async def receive_stream(self, reader, length, job):
+        received = 0
+        try:
+            while received < length:
+                data = await asyncio.wait_for(reader.read(min(length - received, STREAM_CHUNK_SIZE)), STREAM_TIMEOUT)
+                if not data:
+                    raise asyncio.IncompleteReadError(b"\0", length)
+
+                if job is not None:
+                    job.feed(data)
+                received += len(data)
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, OSError):
+            if job is not None:
+                job.stream.fail("Connection closed before the full payload was received")
+            raise
+
+        if job is not None:
+            job.finish()
+
+    def receive_control(self, message, client):
+        if message.startswith(CLIENT_CHECK_SERVER):
+            return self.check_server(message, client)
+
+        if message == CLIENT_QUEUE_STATUS:
+            return self.queue_status()
+
+        if message == CLIENT_CANCEL_IMPORT:
+            return self.cancel_import()
+
+        return None
+
+    # Mapped mode, the payload is written to a file or named shared memory and only its location is sent:
+    # FPClientMappedFile:{"Path" or "Name", "Size", "Checksum" (crc32), "Compressed"}
+    # runs on a worker thread so other clients are still served while a large payload is parsed
+    def receive_mapped_file(self, message, client):
+        try:
+            request = json.loads(message[len(CLIENT_MAPPED_FILE) + 1:])
+            size = int(request["Size"])
+            checksum = int(request["Checksum"])
+        except (ValueError, KeyError, TypeError) as e:
+            return self.error(f"Invalid mapped file request: {e}")
+
+        if size > MAX_FRAME_SIZE:
+            return self.error(f"Mapped payload is too large ({size} bytes)")
+
+        try:
+            mapping = self.map_payload(request, size)
+        except (OSError, ValueError, KeyError) as e:
+            return self.error(f"Failed to map payload: {e}")
+
+        with mapping, memoryview(mapping) as view:
+            if len(view) < size:
+                return self.error(f"Mapped payload is smaller than expected ({len(view)} of {size} bytes)")
+
+            if zlib.crc32(view[:size]) != checksum:
+                return self.error("Mapped payload checksum does not match")
+
+            if (job := self.begin_job(bool(request.get("Compressed")), client)) is None:
+                return self.busy()
+
+            # parsed straight from the mapping, chunked so the first entries are queued before the rest is parsed
+            try:
+                for offset in range(0, size, STREAM_CHUNK_SIZE):
+                    job.feed(view[offset:min(offset + STREAM_CHUNK_SIZE, size)])
+                job.finish()
+            finally:
+                job.abort("Failed to read the full mapped payload")
+
+        return self.received(job)
+
+    @staticmethod
+    def map_payload(request, size):
+        if (name := request.get("Name")) is not None:
+            if os.name != "nt":
+                raise ValueError("Named shared memory is only available on Windows, send a Path instead")
+            return mmap.mmap(-1, size, tagname=name, access=mmap.ACCESS_READ)
+
+        with open(request["Path"], "rb") as file:
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def begin_job(self, compressed=False, client=None):
+        job = ImportJob(next(self.request_ids), compressed, self.reply_to(client), self.recorder)
+        if not self.import_queue.put(job):
+            Log.warning(f"Import queue is full ({self.import_queue.capacity} queued), rejecting request")
+            return None
+
+        return job
+
+    # clients that understand more than JSON append ":<features>" and get the supported features back
+    def check_server(self, message, client):
+        if message == CLIENT_CHECK_SERVER:
+            return SERVER_RECEIVED
+
+        # legacy clients would mistake progress messages for replies, so they are only sent on request
+        features = message[len(CLIENT_CHECK_SERVER) + 1:].split(b",")
+        if not isinstance(client, asyncio.StreamWriter):
+            # UDP ports are reused by other clients, so this only lasts for the payload that follows
+            self.datagram_session(client).progress = b"progress" in features
+        elif b"progress" in features:
+            self.progress_clients.add(client)
+        else:
+            self.progress_clients.discard(client)
+
+        return SERVER_RECEIVED + f":{','.join(SERVER_CAPABILITIES)}".encode('utf-8')
+
+    @staticmethod
+    def received(job):
+        if job is None:
+            return SERVER_RECEIVED
+        return SERVER_RECEIVED + f":{job.request_id}".encode('utf-8')
+
+    def busy(self):
+        return SERVER_BUSY + f":{self.import_queue.depth()}".encode('utf-8')
+
+    @staticmethod
+    def error(message):
+        Log.error(message)
+        return SERVER_ERROR + f":{message}".encode('utf-8')
+
+    # FPServerQueueStatus:{"Queued", "Capacity", "LastWait", "AverageWait", "MaxWait"}
+    def queue_status(self):
+        return SERVER_QUEUE_STATUS + f":{json.dumps(self.import_queue.statistics())}".encode('utf-8')
+
+    def cancel_import(self):
+        if (job := self.import_queue.active_job) is None:
+            return SERVER_RECEIVED
+
+        job.cancelled = True
+        return self.received(job)
+
+    # send function for the progress messages of a job, called from the Blender thread
+    def reply_to(self, client):
+        if isinstance(client, asyncio.StreamWriter):
+            if client not in self.progress_clients:
+                return None
+
+            def reply(payload):
+                if client.is_closing():
+                    raise ConnectionError("Connection closed")
+                self.call_in_loop(self.send_frame, client, payload)
+            return reply
+
+        if (session := self.datagram_sessions.get(client)) is None or not session.progress:
+            return None
+
+        return lambda payload: self.call_in_loop(self.datagram_transport.sendto, payload, client)
+
+    def call_in_loop(self, callback, *args):
+        try:
+            self.loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError as e:
+            raise ConnectionError("FortnitePorting Server is closed") from e
+
+    @staticmethod
+    def send_frame(writer, payload, flags=0):
+        writer.write(FRAME_HEADER.pack(FRAME_MAGIC, flags, len(payload)) + payload)
 
     def stop(self):
         self.keep_alive = False
-        self.socket_server.close()
-        Log.information("FortnitePorting Server Closed")
+        if self.wake_event is not None:
+            try:
+                self.loop.call_soon_threadsafe(self.wake_event.set)
+            except RuntimeError:
+                pass
+        self.join(STREAM_TIMEOUT)
 
 
 # Name, Slot, Location, *Linear
@@ -141,7 +1213,7 @@ vector_mappings = {
 }
 
 
-def import_mesh(path: str, import_mesh: bool = True, reorient_bones: bool = False) -> bpy.types.Object:
+def import_mesh(path: str, import_mesh: bool = True, reorient_bones: bool = False, morph_names: list = None) -> bpy.types.Object:
     path = path[1:] if path.startswith("/") else path
     mesh_path = os.path.join(import_assets_root, path.split(".")[0] + "_LOD0")
 
@@ -150,7 +1222,8 @@ def import_mesh(path: str, import_mesh: bool = True, reorient_bones: bool = Fals
     if os.path.exists(mesh_path + ".pskx"):
         mesh_path += ".pskx"
 
-    if not pskimport(mesh_path, bReorientBones=reorient_bones, bImportmesh = import_mesh):
+    # morph_names None imports every morph target, otherwise only the named ones
+    if not pskimport(mesh_path, bReorientBones=reorient_bones, bImportmesh = import_mesh, morph_names=morph_names):
         return None
 
     return bpy.context.active_object
@@ -183,11 +1256,15 @@ def import_texture(path: str) -> bpy.types.Image:
 
     return bpy.data.images.load(texture_path, check_existing=True)
 
-def import_anim(path: str):
+# the selected armature when armatures is None, the psa is decoded once for all of them and kept cached
+def import_anim(path: str, armatures: list = None):
     path = path[1:] if path.startswith("/") else path
     anim_path = os.path.join(import_assets_root, path.split(".")[0] + "_SEQ0" + ".psa")
 
-    return psaimport(anim_path)
+    if armatures is None:
+        return psaimport(anim_path)
+
+    return all(psaimport_armatures(anim_path, armatures))
 
 
 def import_material(target_slot: bpy.types.MaterialSlot, material_data):
@@ -1006,7 +2083,35 @@ def any(target, expr):
 def make_vector(data):
     return Vector((data.get("X"), data.get("Y"), data.get("Z")))
 
-def import_response(response):
+# generator over a whole queued job, yields IMPORT_WAIT while the next entry has not arrived yet
+def import_job(job):
+    import_stream = job.stream
+    while not import_stream.ready:
+        yield IMPORT_WAIT
+
+    if import_stream.error is None:
+        begin_import(import_stream.response)
+
+        import_index = 0
+        while not import_stream.is_done():
+            if (import_data := import_stream.next_entry()) is None:
+                yield IMPORT_WAIT
+                continue
+
+            entry_start = time.perf_counter()
+            yield from import_entry(import_index, import_data)
+            import_index += 1
+
+            # the total is only known once the whole payload has been parsed
+            parts = import_index + import_stream.entries.qsize() if import_stream.finished else None
+            job.report_progress("Imported", Part=import_index, Parts=parts, Name=import_data.get("Name"),
+                                Elapsed=round(time.perf_counter() - entry_start, 4), Total=round(job.elapsed_time(), 4))
+
+    if import_stream.error is not None:
+        Log.error(f"Failed to read import payload: {import_stream.error}")
+        message_box(import_stream.error, "Failed to read import payload", "ERROR")
+
+def begin_import(response):
     append_data()
     global import_assets_root
     import_assets_root = response.get("AssetsRoot")
@@ -1017,169 +2122,180 @@ def import_response(response):
     global imported_materials
     imported_materials = {}
 
-    import_datas = response.get("Data")
-    
-    for import_index, import_data in enumerate(import_datas):
+# generator, every yield is a point where the import can be paused or cancelled
+def import_entry(import_index, import_data):
+    name = import_data.get("Name")
+    import_type = import_data.get("Type")
 
-        name = import_data.get("Name")
-        import_type = import_data.get("Type")
-    
-        Log.information(f"Received Import for {import_type}: {name}")
-        print(json.dumps(import_data))
-    
-        if import_type == "Dance":
-            animation = import_data.get("Animation")
-            props = import_data.get("Props")
-            active_skeleton = armature_from_selection()
-    
-            if not import_anim(animation):
-                message_box("An armature must be selected for the Emote to import onto.", "Failed to Import Emote", "ERROR")
-                continue
+    Log.information(f"Received Import for {import_type}: {name}")
+    print(json.dumps(import_data))
 
-            # remove face keyframes
-            bpy.ops.object.mode_set(mode='POSE')
-            bpy.ops.pose.select_all(action='DESELECT')
-            pose_bones = active_skeleton.pose.bones
-            bones = active_skeleton.data.bones
-            if face_bone := first(bones, lambda x: x.name == "faceAttach"):
-                face_bones = face_bone.children_recursive
-                dispose_paths = []
-                for bone in face_bones:
-                    dispose_paths.append('pose.bones["{}"].rotation_quaternion'.format(bone.name))
-                    dispose_paths.append('pose.bones["{}"].location'.format(bone.name))
-                    dispose_paths.append('pose.bones["{}"].scale'.format(bone.name))
-                    pose_bones[bone.name].matrix_basis = Matrix()
-                dispose_curves = [fcurve for fcurve in active_skeleton.animation_data.action.fcurves if fcurve.data_path in dispose_paths]
-                for fcurve in dispose_curves:
-                    active_skeleton.animation_data.action.fcurves.remove(fcurve)
-            bpy.ops.object.mode_set(mode='OBJECT')
-            
-            if len(props) == 0:
-                continue
+    if import_type == "Dance":
+        animation = import_data.get("Animation")
+        props = import_data.get("Props")
+        active_skeleton = armature_from_selection()
 
-            existing_prop_skel = first(active_skeleton.children, lambda x: x.name == "Prop_Skeleton")
-            if existing_prop_skel:
-                bpy.data.objects.remove(existing_prop_skel, do_unlink=True)
-    
-            master_skeleton = import_skel(import_data.get("Skeleton"))
-            master_skeleton.name = "Prop_Skeleton"
-            master_skeleton.parent = active_skeleton
-    
-            bpy.context.view_layer.objects.active = master_skeleton
-            import_anim(animation)
-            master_skeleton.hide_set(True)
-                      
-            for propData in props:
-                prop = propData.get("Prop")
-                socket_name = propData.get("SocketName")
-                socket_remaps = {
-                    "RightHand": "weapon_r",
-                    "LeftHand": "weapon_l",
-                    "AttachSocket": "attach"
-                }
-    
-                if socket_name in socket_remaps.keys():
-                    socket_name = socket_remaps.get(socket_name)
-    
-                if (imported_item := import_mesh(prop.get("MeshPath"))) is None:
-                        continue
-    
-                bpy.context.view_layer.objects.active = imported_item
-    
-                if animation := propData.get("Animation"):
-                    import_anim(animation)
-    
-                imported_mesh = imported_item
-                if imported_item.type == 'ARMATURE':
-                    imported_mesh = mesh_from_armature(imported_item)
-    
-                for material in prop.get("Materials"):
-                    index = material.get("SlotIndex")
-                    import_material(imported_mesh.material_slots.values()[index], material)
-    
-                if location_offset := propData.get("LocationOffset"):
-                    imported_item.location += make_vector(location_offset)*0.01
-    
-                if scale := propData.get("Scale"):
-                    imported_item.scale = make_vector(scale)
-    
-                rotation = [0,0,0]
-                if rotation_offset := propData.get("RotationOffset"):
-                    rotation[0] += radians(rotation_offset.get("Roll"))
-                    rotation[1] += radians(rotation_offset.get("Pitch"))
-                    rotation[2] += -radians(rotation_offset.get("Yaw"))
-                constraint_object(imported_item, master_skeleton, socket_name, rotation)
-    
-        else:
-            imported_parts = []
-            style_meshes = import_data.get("StyleMeshes")
-            
-            def import_parts(parts):
-                for part in parts:
-                    part_type = part.get("Part")
-                    if any(imported_parts, lambda x: False if x is None else x.get("Part") == part_type) and import_type == "Outfit":
-                        continue
-    
-                    target_mesh = part.get("MeshPath")
-                    if found_mesh := first(style_meshes, lambda x: x.get("MeshToSwap") == target_mesh):
-                        target_mesh = found_mesh.get("MeshToSwap")
-                    
-                    if (imported_part := import_mesh(target_mesh, reorient_bones=import_settings.get("ReorientBones"))) is None:
-                        continue
+        if not import_anim(animation):
+            message_box("An armature must be selected for the Emote to import onto.", "Failed to Import Emote", "ERROR")
+            return
 
-                    imported_part.location += make_vector(part.get("Offset"))*0.01
-                        
-                    if import_type == "Prop":
-                        imported_part.location = imported_part.location + Vector((1,0,0))*import_index
-    
-                    has_armature = imported_part.type == "ARMATURE"
-                    if has_armature:
-                        mesh = mesh_from_armature(imported_part)
-                    else:
-                        mesh = imported_part
-                    bpy.context.view_layer.objects.active = mesh
-    
-                    imported_parts.append({
-                        "Part": part_type,
-                        "Armature": imported_part if has_armature else None,
-                        "Mesh": mesh,
-                        "Socket": part.get("SocketName")
-                    })
-                    
-                    if (morph_name := part.get("MorphName")) and mesh.data.shape_keys is not None:
-                        for key in mesh.data.shape_keys.key_blocks:
-                            if key.name.casefold() == morph_name.casefold():
-                                key.value = 1.0
-    
-                    if import_settings.get("QuadTopo"):
-                        bpy.ops.object.editmode_toggle()
-                        bpy.ops.mesh.tris_convert_to_quads(uvs=True)
-                        bpy.ops.object.editmode_toggle()
-    
-                    for material in part.get("Materials"):
-                        index = material.get("SlotIndex")
-                        import_material(mesh.material_slots.values()[index], material)
-    
-                    for override_material in part.get("OverrideMaterials"):
-                        index = override_material.get("SlotIndex")
-                        import_material(mesh.material_slots.values()[index], override_material)
-    
-            import_parts(import_data.get("StyleParts"))
-            import_parts(import_data.get("Parts"))
-    
-            for imported_part in imported_parts:
-                mesh = imported_part.get("Mesh")
-                for style_material in import_data.get("StyleMaterials"):
-                    if slot := mesh.material_slots.get(style_material.get("MaterialNameToSwap")):
-                        import_material(slot, style_material)
-    
-            if import_settings.get("MergeSkeletons") and import_type == "Outfit":
-                master_skeleton = merge_skeletons(imported_parts)
-                if RigType(import_settings.get("RigType")) == RigType.TASTY:
-                    apply_tasty_rig(master_skeleton)
+        # remove face keyframes
+        bpy.ops.object.mode_set(mode='POSE')
+        bpy.ops.pose.select_all(action='DESELECT')
+        pose_bones = active_skeleton.pose.bones
+        bones = active_skeleton.data.bones
+        if face_bone := first(bones, lambda x: x.name == "faceAttach"):
+            face_bones = face_bone.children_recursive
+            dispose_paths = []
+            for bone in face_bones:
+                dispose_paths.append('pose.bones["{}"].rotation_quaternion'.format(bone.name))
+                dispose_paths.append('pose.bones["{}"].location'.format(bone.name))
+                dispose_paths.append('pose.bones["{}"].scale'.format(bone.name))
+                pose_bones[bone.name].matrix_basis = Matrix()
+            dispose_curves = [fcurve for fcurve in active_skeleton.animation_data.action.fcurves if fcurve.data_path in dispose_paths]
+            for fcurve in dispose_curves:
+                active_skeleton.animation_data.action.fcurves.remove(fcurve)
+        bpy.ops.object.mode_set(mode='OBJECT')
+        yield
+        
+        if len(props) == 0:
+            return
+
+        existing_prop_skel = first(active_skeleton.children, lambda x: x.name == "Prop_Skeleton")
+        if existing_prop_skel:
+            bpy.data.objects.remove(existing_prop_skel, do_unlink=True)
+
+        master_skeleton = import_skel(import_data.get("Skeleton"))
+        master_skeleton.name = "Prop_Skeleton"
+        master_skeleton.parent = active_skeleton
+
+        bpy.context.view_layer.objects.active = master_skeleton
+        import_anim(animation, [master_skeleton])
+        master_skeleton.hide_set(True)
+        yield
+                  
+        for propData in props:
+            prop = propData.get("Prop")
+            socket_name = propData.get("SocketName")
+            socket_remaps = {
+                "RightHand": "weapon_r",
+                "LeftHand": "weapon_l",
+                "AttachSocket": "attach"
+            }
+
+            if socket_name in socket_remaps.keys():
+                socket_name = socket_remaps.get(socket_name)
+
+            if (imported_item := import_mesh(prop.get("MeshPath"))) is None:
+                    continue
+
+            bpy.context.view_layer.objects.active = imported_item
+
+            if animation := propData.get("Animation"):
+                import_anim(animation)
+            yield
+
+            imported_mesh = imported_item
+            if imported_item.type == 'ARMATURE':
+                imported_mesh = mesh_from_armature(imported_item)
+
+            for material in prop.get("Materials"):
+                index = material.get("SlotIndex")
+                import_material(imported_mesh.material_slots.values()[index], material)
+                yield
+
+            if location_offset := propData.get("LocationOffset"):
+                imported_item.location += make_vector(location_offset)*0.01
+
+            if scale := propData.get("Scale"):
+                imported_item.scale = make_vector(scale)
+
+            rotation = [0,0,0]
+            if rotation_offset := propData.get("RotationOffset"):
+                rotation[0] += radians(rotation_offset.get("Roll"))
+                rotation[1] += radians(rotation_offset.get("Pitch"))
+                rotation[2] += -radians(rotation_offset.get("Yaw"))
+            constraint_object(imported_item, master_skeleton, socket_name, rotation)
+
+    else:
+        imported_parts = []
+        style_meshes = import_data.get("StyleMeshes")
         
-            bpy.ops.object.select_all(action='DESELECT')
+        def import_parts(parts):
+            for part in parts:
+                part_type = part.get("Part")
+                if any(imported_parts, lambda x: False if x is None else x.get("Part") == part_type) and import_type == "Outfit":
+                    continue
+
+                target_mesh = part.get("MeshPath")
+                if found_mesh := first(style_meshes, lambda x: x.get("MeshToSwap") == target_mesh):
+                    target_mesh = found_mesh.get("MeshToSwap")
+                
+                # only the morph target that gets activated below is imported
+                morph_name = part.get("MorphName")
+                if (imported_part := import_mesh(target_mesh, reorient_bones=import_settings.get("ReorientBones"),
+                                                 morph_names=[morph_name] if morph_name else [])) is None:
+                    continue
+
+                imported_part.location += make_vector(part.get("Offset"))*0.01
+                    
+                if import_type == "Prop":
+                    imported_part.location = imported_part.location + Vector((1,0,0))*import_index
+
+                has_armature = imported_part.type == "ARMATURE"
+                if has_armature:
+                    mesh = mesh_from_armature(imported_part)
+                else:
+                    mesh = imported_part
+                bpy.context.view_layer.objects.active = mesh
+
+                imported_parts.append({
+                    "Part": part_type,
+                    "Armature": imported_part if has_armature else None,
+                    "Mesh": mesh,
+                    "Socket": part.get("SocketName")
+                })
+                
+                if morph_name and mesh.data.shape_keys is not None:
+                    for key in mesh.data.shape_keys.key_blocks:
+                        if key.name.casefold() == morph_name.casefold():
+                            key.value = 1.0
+
+                if import_settings.get("QuadTopo"):
+                    bpy.ops.object.editmode_toggle()
+                    bpy.ops.mesh.tris_convert_to_quads(uvs=True)
+                    bpy.ops.object.editmode_toggle()
+                yield
+
+                for material in part.get("Materials"):
+                    index = material.get("SlotIndex")
+                    import_material(mesh.material_slots.values()[index], material)
+                    yield
+
+                for override_material in part.get("OverrideMaterials"):
+                    index = override_material.get("SlotIndex")
+                    import_material(mesh.material_slots.values()[index], override_material)
+                    yield
+
+        yield from import_parts(import_data.get("StyleParts"))
+        yield from import_parts(import_data.get("Parts"))
+
+        for imported_part in imported_parts:
+            mesh = imported_part.get("Mesh")
+            for style_material in import_data.get("StyleMaterials"):
+                if slot := mesh.material_slots.get(style_material.get("MaterialNameToSwap")):
+                    import_material(slot, style_material)
+                    yield
+
+        if import_settings.get("MergeSkeletons") and import_type == "Outfit":
+            master_skeleton = merge_skeletons(imported_parts)
+            yield
+            if RigType(import_settings.get("RigType")) == RigType.TASTY:
+                apply_tasty_rig(master_skeleton)
+                yield
     
+        bpy.ops.object.select_all(action='DESELECT')
+
 def message_box(message = "", title = "Message Box", icon = 'INFO'):
 
     def draw(self, context):
@@ -1187,27 +2303,63 @@ def message_box(message = "", title = "Message Box", icon = 'INFO'):
 
     bpy.context.window_manager.popup_menu(draw, title = title, icon = icon)
 
+class FORTNITEPORTING_OT_cancel_import(bpy.types.Operator):
+    """Stop the running Fortnite Porting import after its current step"""
+    bl_idname = "fortniteporting.cancel_import"
+    bl_label = "Cancel Fortnite Porting Import"
+
+    def execute(self, context):
+        scheduler.cancel()
+        return {'FINISHED'}
+
+def restart_server(self, context):
+    global server
+    server.stop()
+    server = Receiver(server.import_queue, self.host, self.port, bpy.path.abspath(self.capture_path))
+    server.start()
+
+class FortnitePortingPreferences(bpy.types.AddonPreferences):
+    bl_idname = __name__
+
+    host: bpy.props.StringProperty(name="Bind Address", default=SERVER_HOST, update=restart_server)
+    port: bpy.props.IntProperty(name="Port", default=SERVER_PORT, min=1, max=65535, update=restart_server)
+    capture_path: bpy.props.StringProperty(name="Capture File", description="Record every import request to this file, leave empty to disable", subtype='FILE_PATH', update=restart_server)
+
+    def draw(self, context):
+        self.layout.prop(self, "host")
+        self.layout.prop(self, "port")
+        self.layout.prop(self, "capture_path")
+        self.layout.label(text="Every Blender instance needs its own port, the exporter has to use the same one")
+
 def register():
-    import_event = threading.Event()
+    bpy.utils.register_class(FortnitePortingPreferences)
+    host, port, capture_path = SERVER_HOST, SERVER_PORT, None
+    if (addon := bpy.context.preferences.addons.get(__name__)) is not None:
+        preferences = addon.preferences
+        host, port, capture_path = preferences.host, preferences.port, bpy.path.abspath(preferences.capture_path)
+
+    import_queue = ImportQueue()
 
     global server
-    server = Receiver(import_event)
+    server = Receiver(import_queue, host, port, capture_path)
     server.start()
 
+    global scheduler
+    scheduler = ImportScheduler(import_queue)
+
     def handler():
-        if import_event.is_set():
-            try:
-                import_response(server.data)
-            except Exception as e:
-                error_str = str(e)
-                Log.error(f"An unhandled error occurred:")
-                traceback.print_exc()
-                message_box(error_str, "An unhandled error occurred", "ERROR")
-                
-            import_event.clear()
+        if not scheduler.is_busy():
+            if (job := import_queue.get()) is None:
+                return 0.01
+            scheduler.start(job)
+
+        scheduler.tick()
         return 0.01
 
     bpy.app.timers.register(handler, persistent=True)
+    bpy.utils.register_class(FORTNITEPORTING_OT_cancel_import)
 
 def unregister():
+    bpy.utils.unregister_class(FORTNITEPORTING_OT_cancel_import)
+    bpy.utils.unregister_class(FortnitePortingPreferences)
     server.stop()
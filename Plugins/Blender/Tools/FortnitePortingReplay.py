@@ -0,0 +1,303 @@
+"""
+Replays import requests against a running Fortnite Porting Blender server and reports how it kept up.
+
+Requests come from a capture file recorded by the server (Capture File in the addon preferences)
+or from raw payload files, so regressions can be reproduced without the exporter or any game files:
+
+    python FortnitePortingReplay.py capture.fpcap                      original timing
+    python FortnitePortingReplay.py capture.fpcap --speed 4            four times faster
+    python FortnitePortingReplay.py capture.fpcap --rate 2 --repeat 5  two requests per second
+    python FortnitePortingReplay.py --payload request.json --count 20 --rate 0 --transport tcp
+
+The protocol constants mirror FortnitePortingServer.py and have to be kept in sync with it.
+"""
+
+import argparse
+import json
+import socket
+import struct
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+SERVER_HOST = "localhost"
+SERVER_PORT = 24280
+BUFFER_SIZE = 4096
+
+CLIENT_MESSAGE_FINISHED = b"FPClientMessageFinished"
+CLIENT_CHECK_SERVER = b"FPClientCheckServer"
+SERVER_RECEIVED = b"FPServerReceived"
+SERVER_BUSY = b"FPServerBusy"
+SERVER_ERROR = b"FPServerError"
+SERVER_FINISHED = b"FPServerFinished"
+
+CLIENT_FEATURES = b"json,binary,zlib,progress"
+BINARY_MAGIC = b"FPB\x01"
+COMPRESSED_MAGIC = b"FPZ\x01"
+
+FRAME_HEADER = struct.Struct("<2sBI")
+FRAME_MAGIC = b"FP"
+FRAME_COMPRESSED = 0x01
+
+CAPTURE_MAGIC = b"FPCAP\x01"
+CAPTURE_RECORD = struct.Struct("<ddBI")
+CAPTURE_COMPRESSED = 0x01
+
+Request = namedtuple("Request", ["arrival_time", "compressed", "payload"])
+Result = namedtuple("Result", ["status", "request_id", "size", "received_latency", "finished_latency", "error"])
+
+
+def read_capture(path):
+    requests = []
+    with open(path, "rb") as file:
+        if file.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+            raise ValueError(f"{path} is not a Fortnite Porting capture file")
+
+        while header := file.read(CAPTURE_RECORD.size):
+            if len(header) < CAPTURE_RECORD.size:
+                print(f"Ignoring truncated record at the end of {path}")
+                break
+
+            arrival_time, _, flags, length = CAPTURE_RECORD.unpack(header)
+            payload = file.read(length)
+            if len(payload) < length:
+                print(f"Ignoring truncated record at the end of {path}")
+                break
+
+            requests.append(Request(arrival_time, bool(flags & CAPTURE_COMPRESSED), payload))
+
+    # records are written when a payload is complete, replay them in the order they started arriving
+    requests.sort(key=lambda request: request.arrival_time)
+    return requests
+
+
+def read_payloads(paths, count):
+    requests = []
+    for path in paths:
+        with open(path, "rb") as file:
+            requests.append(Request(0.0, False, file.read()))
+    return requests * count
+
+
+# seconds after the start of the replay at which every request is sent
+def schedule(requests, speed, rate):
+    if rate is not None:
+        return [index / rate if rate > 0 else 0.0 for index in range(len(requests))]
+
+    first_arrival = min((request.arrival_time for request in requests), default=0.0)
+    return [(request.arrival_time - first_arrival) / speed if speed > 0 else 0.0 for request in requests]
+
+
+class Client:
+    """Sends one request the way the exporter does and waits for the server to answer it"""
+
+    def __init__(self, host, port, transport, timeout, wait_finished):
+        self.host = host
+        self.port = port
+        self.transport = transport
+        self.timeout = timeout
+        self.wait_finished = wait_finished
+
+    def send(self, request):
+        start_time = time.perf_counter()
+        try:
+            if self.transport == "tcp":
+                return self.send_stream(request, start_time)
+            return self.send_datagrams(request, start_time)
+        except (OSError, ValueError) as e:
+            return Result("Failed", None, len(request.payload), None, None, str(e))
+
+    def send_datagrams(self, request, start_time):
+        payload = request.payload
+        if request.compressed and not payload.startswith(COMPRESSED_MAGIC):
+            payload = COMPRESSED_MAGIC + payload
+
+        # every request gets its own socket, which the server treats as its own session
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as client:
+            client.settimeout(self.timeout)
+            client.connect((self.host, self.port))
+            if self.wait_finished:
+                client.send(CLIENT_CHECK_SERVER + b":" + CLIENT_FEATURES)
+                client.recv(BUFFER_SIZE)
+
+            for offset in range(0, len(payload), BUFFER_SIZE):
+                client.send(payload[offset:offset + BUFFER_SIZE])
+            client.send(CLIENT_MESSAGE_FINISHED)
+
+            return self.receive_result(lambda: client.recv(65536), request, start_time)
+
+    def send_stream(self, request, start_time):
+        with socket.create_connection((self.host, self.port), self.timeout) as client:
+            if self.wait_finished:
+                self.send_frame(client, CLIENT_CHECK_SERVER + b":" + CLIENT_FEATURES)
+                self.receive_frame(client)
+
+            self.send_frame(client, request.payload, FRAME_COMPRESSED if request.compressed else 0)
+            return self.receive_result(lambda: self.receive_frame(client), request, start_time)
+
+    def receive_result(self, receive, request, start_time):
+        size = len(request.payload)
+        while (message := receive()).startswith(b"FPServerProgress"):
+            pass
+
+        received_latency = time.perf_counter() - start_time
+        if message.startswith(SERVER_BUSY):
+            return Result("Busy", None, size, received_latency, None, message.decode('utf-8'))
+        if message.startswith(SERVER_ERROR):
+            return Result("Error", None, size, received_latency, None, message[len(SERVER_ERROR) + 1:].decode('utf-8'))
+        if not message.startswith(SERVER_RECEIVED + b":"):
+            return Result("Failed", None, size, received_latency, None, f"Unexpected reply {message[:64]!r}")
+
+        request_id = int(message[len(SERVER_RECEIVED) + 1:])
+        if not self.wait_finished:
+            return Result("Received", request_id, size, received_latency, None, None)
+
+        # the whole import has to run before this arrives, so the timeout only applies between messages
+        while True:
+            message = receive()
+            if not message.startswith(SERVER_FINISHED):
+                continue
+
+            finished = json.loads(message[len(SERVER_FINISHED) + 1:])
+            if finished.get("RequestId") != request_id:
+                continue
+
+            finished_latency = time.perf_counter() - start_time
+            status = "Imported" if finished.get("Success") else "Cancelled" if finished.get("Cancelled") else "Failed"
+            return Result(status, request_id, size, received_latency, finished_latency, finished.get("Error"))
+
+    @staticmethod
+    def send_frame(client, payload, flags=0):
+        client.sendall(FRAME_HEADER.pack(FRAME_MAGIC, flags, len(payload)) + payload)
+
+    @staticmethod
+    def receive_frame(client):
+        _, _, length = FRAME_HEADER.unpack(Client.receive_exact(client, FRAME_HEADER.size))
+        return Client.receive_exact(client, length)
+
+    @staticmethod
+    def receive_exact(client, size):
+        data = bytearray()
+        while len(data) < size:
+            if not (chunk := client.recv(size - len(data))):
+                raise ConnectionError("Connection closed by the server")
+            data += chunk
+        return bytes(data)
+
+
+def check_server(host, port, timeout):
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as client:
+        client.settimeout(timeout)
+        client.sendto(CLIENT_CHECK_SERVER + b":" + CLIENT_FEATURES, (host, port))
+        reply = client.recv(BUFFER_SIZE)
+
+    if not reply.startswith(SERVER_RECEIVED):
+        raise ConnectionError(f"Unexpected reply {reply!r}")
+
+    # servers from before the capability handshake only answer FPServerReceived
+    return set(reply[len(SERVER_RECEIVED) + 1:].decode('utf-8').split(",")) if b":" in reply else {"json"}
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, round(fraction * len(values)) - 1))]
+
+
+def report(results, elapsed):
+    total_bytes = sum(result.size for result in results)
+    print(f"\n{len(results)} requests, {total_bytes / 1024 / 1024:.2f} MB in {elapsed:.2f}s")
+    print(f"Throughput: {len(results) / elapsed:.2f} requests/s, {total_bytes / 1024 / 1024 / elapsed:.2f} MB/s")
+
+    statuses = {}
+    for result in results:
+        statuses[result.status] = statuses.get(result.status, 0) + 1
+    print("Results: " + ", ".join(f"{status} {count}" for status, count in sorted(statuses.items())))
+
+    for name, field in (("Received", "received_latency"), ("Finished", "finished_latency")):
+        latencies = [getattr(result, field) for result in results if getattr(result, field) is not None]
+        if not latencies:
+            continue
+
+        points = ", ".join(f"p{int(fraction * 100)} {percentile(latencies, fraction) * 1000:.1f}ms" for fraction in (0.5, 0.9, 0.99))
+        print(f"{name} latency: {points}, max {max(latencies) * 1000:.1f}ms")
+
+    failures = [result for result in results if result.status not in ("Received", "Imported")]
+    for result in failures[:10]:
+        print(f"  {result.status}: {result.error}")
+    if len(failures) > 10:
+        print(f"  ... and {len(failures) - 10} more")
+
+    return len(failures)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay import requests against a Fortnite Porting Blender server")
+    parser.add_argument("capture", nargs="?", help="capture file recorded by the server")
+    parser.add_argument("--payload", nargs="+", default=[], help="raw request payload files to send instead of a capture")
+    parser.add_argument("--count", type=int, default=1, help="how often every payload file is sent")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--transport", choices=("udp", "tcp"), default="udp")
+    parser.add_argument("--speed", type=float, default=1.0, help="multiplier on the recorded timing, 0 sends everything at once")
+    parser.add_argument("--rate", type=float, help="send at a fixed number of requests per second instead of the recorded timing")
+    parser.add_argument("--repeat", type=int, default=1, help="play the requests this many times")
+    parser.add_argument("--concurrency", type=int, default=4, help="requests that may be in flight at once")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for each reply")
+    parser.add_argument("--no-wait", dest="wait_finished", action="store_false", help="only wait for FPServerReceived, not for the import to finish")
+    args = parser.parse_args()
+
+    if args.capture:
+        requests = read_capture(args.capture)
+    elif args.payload:
+        requests = read_payloads(args.payload, args.count)
+    else:
+        parser.error("either a capture file or --payload is required")
+
+    if not requests:
+        print("Nothing to replay")
+        return 0
+
+    try:
+        capabilities = check_server(args.host, args.port, args.timeout)
+    except OSError as e:
+        print(f"No server at {args.host}:{args.port}: {e}")
+        return 1
+    print(f"Server at {args.host}:{args.port} supports {', '.join(sorted(capabilities))}")
+
+    if args.wait_finished and "progress" not in capabilities:
+        print("Server does not report progress, only measuring until FPServerReceived")
+        args.wait_finished = False
+    if "binary" not in capabilities and any(request.payload.startswith(BINARY_MAGIC) for request in requests):
+        print("Warning: the capture has binary payloads but the server only accepts JSON")
+
+    offsets = schedule(requests, args.speed, args.rate)
+    duration = offsets[-1] - offsets[0] if args.rate is None else len(requests) / args.rate if args.rate else 0.0
+    client = Client(args.host, args.port, args.transport, args.timeout, args.wait_finished)
+
+    results = []
+    results_lock = threading.Lock()
+
+    def send(request):
+        result = client.send(request)
+        with results_lock:
+            results.append(result)
+            print(f"[{len(results)}/{len(requests) * args.repeat}] {result.status} {result.size} bytes", flush=True)
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as executor:
+        for iteration in range(args.repeat):
+            iteration_start = iteration * duration
+            for request, offset in zip(requests, offsets):
+                if (delay := start_time + iteration_start + offset - time.perf_counter()) > 0:
+                    time.sleep(delay)
+                executor.submit(send, request)
+
+    return 1 if report(results, time.perf_counter() - start_time) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
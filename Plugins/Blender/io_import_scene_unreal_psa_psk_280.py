@@ -70,17 +70,21 @@ Version': '2.8.1' edited by Half
 # https://github.com/gildor2/UModel/blob/master/Exporters/Psk.h
 
 import bpy
+import os
 import re
-from mathutils import Vector, Matrix, Quaternion
+from mathutils import Vector, Quaternion
 from bpy.props import (FloatProperty,
+                        IntProperty,
                         StringProperty,
                         BoolProperty,
                         EnumProperty,
                         PointerProperty )
 
-from struct import unpack, unpack_from, Struct
+import numpy as np
 import time
 
+from unreal_psk_psa_decoder import DecodeError, PSK_SKELETON_CHUNKS, read_psk, read_psa
+
 #DEV
 # from mathutils import *
 # from math import *
@@ -122,29 +126,26 @@ def utils_set_mode(mode):
         # bpy.ops.object.mode_set(mode = mode, toggle = False)
         #dev
 
-# since names have type ANSICHAR(signed char) - using cp1251(or 'ASCII'?)
-def util_bytes_to_str(in_bytes):
-    return in_bytes.rstrip(b'\x00').decode(encoding = 'cp1252', errors = 'replace')
-
 class class_psk_bone:
-    name = ""
-
-    parent = None
+    __slots__ = ('name', 'parent', 'bone_index', 'parent_index', 'orig_quat', 'orig_loc', 'children', 'have_weight_data', 'vertex_group')
 
-    bone_index = 0
-    parent_index = 0
+    def __init__(self, name, bone_index):
+        self.name = name
 
-    # scale = []
+        self.parent = None
 
-    mat_world = None
-    mat_world_rot = None
+        self.bone_index = bone_index
+        # -1 for the root bone
+        self.parent_index = -1
 
-    orig_quat = None
-    orig_loc = None
+        self.orig_quat = None
+        self.orig_loc = None
 
-    children = None
+        self.children = []
 
-    have_weight_data = False
+        self.have_weight_data = False
+        # mesh vertex group of the bone, if it has weights
+        self.vertex_group = None
 
 # TODO simplify?
 def util_select_all(select):
@@ -167,134 +168,353 @@ def util_ui_show_msg(msg):
     bpy.ops.pskpsa.message('INVOKE_DEFAULT', message = msg)
 
 
-PSKPSA_FILE_HEADER = {
-    'psk':b'ACTRHEAD\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00',
-    'psa':b'ANIMHEAD\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'
-}
+def util_gen_name_part(filepath):
+    '''Return file name without extension'''
+    return re.match(r'.*[/\\]([^/\\]+?)(\..{2,5})?$', filepath).group(1)
 
 
-def util_is_header_valid(filename, file_ext, chunk_id, error_callback):
-    '''Return True if chunk_id is a valid psk/psa (file_ext) 'magick number'.'''
-    if chunk_id != PSKPSA_FILE_HEADER[file_ext]:
-        error_callback(
-            "File %s is not a %s file. (header mismach)\nExpected: %s \nPresent %s"  % (
-                filename, file_ext,
-                PSKPSA_FILE_HEADER[file_ext], chunk_id)
-        )
-        return False
-    return True
+# Blender version where Matrix.to_quaternion() moved to Mike Day's method
+MATRIX_TO_QUAT_DAY_VERSION = (3, 5, 0)
+
+# Batched versions of the mathutils operations used by the importer. The float32 ones follow the
+# steps and rounding of mathutils, checked to give the same results to the last bit against the
+# mathutils 3.3 package and Blender 4.2 and 5.0.
+
+def util_vec_lengths(vecs):
+    '''Lengths of (n, 3) float32 vectors, rounded the same as Vector.length.'''
+    return np.sqrt(np.sum(vecs * vecs, axis = 1, dtype = np.float64))
+
+
+def util_quat_to_matrix(quats):
+    '''(n, 4) w,x,y,z unit quaternions to (n, 3, 3) float64 rotation matrices, computed like Quaternion.to_matrix().'''
+    q0, q1, q2, q3 = np.sqrt(2.0) * np.moveaxis(np.asarray(quats, dtype = np.float64), -1, 0)
+    qda, qdb, qdc = q0 * q1, q0 * q2, q0 * q3
+    qaa, qab, qac = q1 * q1, q1 * q2, q1 * q3
+    qbb, qbc, qcc = q2 * q2, q2 * q3, q3 * q3
+
+    return np.stack((
+        1.0 - qbb - qcc, -qdc + qab, qdb + qac,
+        qdc + qab, 1.0 - qaa - qcc, -qda + qbc,
+        -qdb + qac, qda + qbc, 1.0 - qaa - qbb
+        ), axis = -1).reshape(q0.shape + (3, 3))
+
+
+def util_normalize_quats(quats):
+    '''Return (normalized quats, lengths) of (n, 4) float32 quaternions.'''
+    w, x, y, z = quats.T
+    lengths = np.sqrt(w * w + x * x + y * y + z * z)
+    return (quats * (np.float32(1.0) / lengths)[:, None], lengths)
+
+
+def util_mul_matrices(a, b):
+    '''(n, 3, 3) float32 a @ b, summed in the same order as Matrix multiplication.'''
+    return a[:, :, 0, None] * b[:, None, 0, :] + a[:, :, 1, None] * b[:, None, 1, :] + a[:, :, 2, None] * b[:, None, 2, :]
+
+
+def util_matrix_to_quat(mats):
+    '''(n, 3, 3) float32 rotation matrices to w,x,y,z quaternions, like Matrix.to_quaternion() of the running Blender.'''
+    # normalized columns
+    mats = mats * (np.float32(1.0) / np.sqrt(np.sum(mats * mats, axis = 1, dtype = np.float32)))[:, None, :]
+    # mRC - row C, column R
+    ((m00, m10, m20), (m01, m11, m21), (m02, m12, m22)) = np.moveaxis(mats, 0, -1)
+
+    one = np.float32(1.0)
+    quats = np.empty((len(mats), 4), dtype = np.float32)
+
+    def from_trace(case, trace, flip, big):
+        '''Set the biggest component of the case from the trace, return the scale for the others.'''
+        s = np.float32(2.0) * np.sqrt(trace[case])
+        # sign chosen for w >= 0
+        s[flip[case]] *= -1
+        quats[case, big] = np.float32(0.25) * s
+        return one / s
+
+    if bpy.app.version < MATRIX_TO_QUAT_DAY_VERSION:
+        # older Blender: w from the trace while it is positive, else the biggest diagonal element
+        case = m00 + m11 + m22 > 0
+        if case.any():
+            s = from_trace(case, one + (m00 + m11 + m22), np.zeros_like(case), 0)
+            quats[case, 1] = (m12 - m21)[case] * s
+            quats[case, 2] = (m20 - m02)[case] * s
+            quats[case, 3] = (m01 - m10)[case] * s
+
+        rest = ~case
+        case = rest & (m00 > m11) & (m00 > m22)
+        if case.any():
+            s = from_trace(case, one + m00 - m11 - m22, np.zeros_like(case), 1)
+            quats[case, 0] = (m12 - m21)[case] * s
+            quats[case, 2] = (m10 + m01)[case] * s
+            quats[case, 3] = (m20 + m02)[case] * s
+
+        rest &= ~case
+        case = rest & (m11 > m22)
+        if case.any():
+            s = from_trace(case, one + m11 - m00 - m22, np.zeros_like(case), 2)
+            quats[case, 0] = (m20 - m02)[case] * s
+            quats[case, 1] = (m10 + m01)[case] * s
+            quats[case, 3] = (m21 + m12)[case] * s
+
+        case = rest & ~(m11 > m22)
+        if case.any():
+            s = from_trace(case, one + m22 - m00 - m11, np.zeros_like(case), 3)
+            quats[case, 0] = (m01 - m10)[case] * s
+            quats[case, 1] = (m20 + m02)[case] * s
+            quats[case, 2] = (m21 + m12)[case] * s
+
+        # w >= 0, the trace case has it already
+        quats[quats[:, 0] < 0] *= -1
+
+        return util_normalize_quats(quats)[0]
+
+    # since 3.5: the biggest component from the signs of the diagonal, sign chosen for w >= 0
+    case = (m22 < 0) & (m00 > m11)
+    if case.any():
+        s = from_trace(case, one + m00 - m11 - m22, m12 < m21, 1)
+        quats[case, 0] = (m12 - m21)[case] * s
+        quats[case, 2] = (m01 + m10)[case] * s
+        quats[case, 3] = (m20 + m02)[case] * s
+
+    case = (m22 < 0) & ~(m00 > m11)
+    if case.any():
+        s = from_trace(case, one - m00 + m11 - m22, m20 < m02, 2)
+        quats[case, 0] = (m20 - m02)[case] * s
+        quats[case, 1] = (m01 + m10)[case] * s
+        quats[case, 3] = (m12 + m21)[case] * s
+
+    case = ~(m22 < 0) & (m00 < -m11)
+    if case.any():
+        s = from_trace(case, one - m00 - m11 + m22, m01 < m10, 3)
+        quats[case, 0] = (m01 - m10)[case] * s
+        quats[case, 1] = (m20 + m02)[case] * s
+        quats[case, 2] = (m12 + m21)[case] * s
+
+    case = ~(m22 < 0) & ~(m00 < -m11)
+    if case.any():
+        s = from_trace(case, one + m00 + m11 + m22, np.zeros_like(case), 0)
+        quats[case, 1] = (m12 - m21)[case] * s
+        quats[case, 2] = (m20 - m02)[case] * s
+        quats[case, 3] = (m01 - m10)[case] * s
+
+    # round-off fix
+    w, x, y, z = quats.T
+    off_unit = np.abs(w * w + x * x + y * y + z * z - one) >= np.float32(0.0002) * 3
+    if off_unit.any():
+        quats[off_unit] = util_normalize_quats(quats[off_unit])[0]
+
+    return quats
+
+
+def util_rotate_vecs(quats, vecs):
+    '''Rotate (n, 3) float32 vectors by (n, 4) w,x,y,z quaternions, like Vector.rotate(Quaternion).'''
+    rots = util_quat_to_matrix(util_normalize_quats(quats)[0]).astype(np.float32)
+    return rots[:, :, 0] * vecs[:, 0, None] + rots[:, :, 1] * vecs[:, 1, None] + rots[:, :, 2] * vecs[:, 2, None]
+
+
+def util_rotate_quats(quats, others):
+    '''Rotate (n, 4) float32 quaternions by others, like Quaternion.rotate(Quaternion): others @ quats, keeping the length.'''
+    (quats, lengths) = util_normalize_quats(quats)
+    others = util_normalize_quats(others)[0]
+
+    rots = util_mul_matrices(util_quat_to_matrix(others).astype(np.float32), util_quat_to_matrix(quats).astype(np.float32))
+    return util_matrix_to_quat(rots) * lengths[:, None]
+
+
+def util_axis_vecs(vecs):
+    '''Axis-aligned unit vectors that are closest to (n, 3) vecs.'''
+    x, y, z = np.abs(vecs).T
+    axis = np.where(x > y, np.where(x > z, 0, 2), np.where(y > z, 1, 2))
+
+    rows = np.arange(len(vecs))
+    axis_vecs = np.zeros_like(vecs)
+    axis_vecs[rows, axis] = np.where(vecs[rows, axis] >= 0, 1, -1)
+    return axis_vecs
+
+
+def calc_bone_rotations(parents, locs, quats, bone_len, bDirectly, avg_bone_len):
+    '''
+    Orient every bone to its children at once.
 
+    Args:
+        parents: parent index of each bone, -1 for the root
+        locs, quats: bind pose of each bone, (n, 3) and (n, 4) w,x,y,z float32
 
-def util_gen_name_part(filepath):
-    '''Return file name without extension'''
-    return re.match(r'.*[/\\]([^/\\]+?)(\..{2,5})?$', filepath).group(1)
+    Returns (bone_sizes, vecys, targets): the new length of each bone,
+    and per bone the rotation_difference from its vecy to its target vector gives the orient quaternion.
+    '''
+    bones_total = len(parents)
+    children = np.flatnonzero(parents >= 0)
+    children_parents = parents[children]
 
+    child_counts = np.bincount(children_parents, minlength = bones_total)
 
-def vec_to_axis_vec(vec_in, vec_out):
-    '''Make **vec_out** to be an axis-aligned unit vector that is closest to vec_in. (basis?)'''
-    x, y, z = vec_in
-    if abs(x) > abs(y):
-        if abs(x) > abs(z):
-            vec_out.x = 1 if x >= 0 else -1
-        else:
-            vec_out.z = 1 if z >= 0 else -1
-    else:
-        if abs(y) > abs(z):
-            vec_out.y = 1 if y >= 0 else -1
-        else:
-            vec_out.z = 1 if z >= 0 else -1
+    # sums in child order, like adding the children up one by one
+    sumvec = np.zeros((bones_total, 3), dtype = np.float32)
+    np.add.at(sumvec, children_parents, locs[children])
 
+    sumlen = np.zeros(bones_total)
+    np.add.at(sumlen, children_parents, util_vec_lengths(locs[children]))
+    sumlen = np.maximum(sumlen / np.maximum(child_counts, 1), 0.01)
 
-def calc_bone_rotation(psk_bone, bone_len, bDirectly, avg_bone_len):
-    children = psk_bone.children
+    bone_sizes = np.where(child_counts > 0, sumlen, bone_len)
+    vecys = np.zeros((bones_total, 3), dtype = np.float32)
+    vecys[:, 1] = 1.0
 
-    vecy = Vector((0.0, 1.0, 0.0))
-    quat = Quaternion((1.0, 0.0, 0.0, 0.0))
-    axis_vec = Vector()
+    # bone with > 0 children
+    if bDirectly:
+        targets = sumvec
+    else:
+        axis_vecs = util_axis_vecs(sumvec)
+        targets = axis_vecs.copy()
 
     # bone with 0 children (orphan bone)
-    if len(children) == 0:
-        # Single bone. ALONE.
-        if psk_bone.parent == None:
-            return (bone_len, quat)
+    orphans = np.flatnonzero(child_counts == 0)
+    orphan_parents = parents[orphans]
 
-        elif bDirectly:
-                        # @
-            # axis_vec = psk_bone.orig_quat * psk_bone.orig_loc
-            axis_vec = psk_bone.orig_loc.copy()
-            axis_vec.rotate( psk_bone.orig_quat )
+    if bDirectly:
+        targets[orphans] = util_rotate_vecs(quats[orphans], locs[orphans])
+    else:
+        conjugated = quats[orphans] * np.array((1.0, -1.0, -1.0, -1.0), dtype = np.float32)
+        targets[orphans] = util_axis_vecs(util_rotate_vecs(conjugated, axis_vecs[np.maximum(orphan_parents, 0)]))
 
-        else:
-            # bone Head near parent Head?
-            if psk_bone.orig_loc.length < 0.1 * avg_bone_len:
-                # @
-                # vec_to_axis_vec(psk_bone.orig_quat.conjugated() * psk_bone.parent.axis_vec, axis_vec)
-                v = psk_bone.parent.axis_vec.copy()
-                v.rotate( psk_bone.orig_quat.conjugated() )
-                vec_to_axis_vec(v, axis_vec)
-
-                # reorient bone to other axis bychanging our base Y vec...
-                # this is not tested well
-                vecy = Vector((1.0, 0.0, 0.0))
-            else:
-                # @
-                # vec_to_axis_vec(psk_bone.orig_quat.conjugated() * psk_bone.parent.axis_vec, axis_vec)
-                v = psk_bone.parent.axis_vec.copy()
-                v.rotate( psk_bone.orig_quat.conjugated() )
-                vec_to_axis_vec(v, axis_vec)
+        # bone Head near parent Head? reorient bone to other axis by changing our base Y vec...
+        # this is not tested well
+        near_parent = orphans[util_vec_lengths(locs[orphans]) < 0.1 * avg_bone_len]
+        vecys[near_parent] = (1.0, 0.0, 0.0)
 
-        return (bone_len, vecy.rotation_difference(axis_vec))
+    # Single bone. ALONE.
+    alone = orphans[orphan_parents < 0]
+    targets[alone] = vecys[alone]
 
-    # bone with > 0 children BUT only 1 non orphan bone ( reorient to it! )
-    if bDirectly and len(children) > 1:
+    # bone with > 1 children BUT only 1 non orphan bone ( reorient to it! )
+    if bDirectly:
+        parent_children = children[child_counts[children] > 0]
+        childs_with_childs = np.bincount(parents[parent_children], minlength = bones_total)
 
-        childs_with_childs = 0
+        candidates = np.zeros(bones_total, dtype = parents.dtype)
+        candidates[parents[parent_children]] = parent_children
 
-        for child in filter(lambda c: len(c.children), children):
+        reoriented = np.flatnonzero((child_counts > 1) & (childs_with_childs == 1))
+        targets[reoriented] = locs[candidates[reoriented]]
+        # len() of the location Vector, not its length
+        bone_sizes[reoriented] = 3
 
-            childs_with_childs += 1
+    return (bone_sizes, vecys, targets)
 
-            if childs_with_childs > 1:
-                break
 
-            candidate = child
+def util_bone_parents(parent_indices):
+    '''Parent index table of psk bones: bone 0 with parent_index <= 0 is the root (-1), any other negative parent_index means bone 0.'''
+    parents = np.maximum(parent_indices, 0)
+    if len(parents) and parents[0] == 0:
+        parents[0] = -1
+    return parents
 
-        if childs_with_childs == 1:
-            # print('candidate',psk_bone.name,candidate.name)
-            return (len(candidate.orig_loc), vecy.rotation_difference(candidate.orig_loc))
 
-    # bone with > 0 children
-    sumvec = Vector()
-    sumlen = 0
+def util_solve_bone_world(parents, local_rots, locs, root_rot):
+    '''
+    Return (world_rots, heads) of the bones in float64, or None if some bones can't be reached from the root.
 
-    for child in children:
-        sumvec += (child.orig_loc)
-        sumlen += child.orig_loc.length
-    sumlen /= len(children)
-    sumlen = max(sumlen, 0.01)
+    world_rots - world space bone rotation WITH own rotation, the mat_world_rot of the bone
+    heads      - world space head position, the parent's world rotation applied to the bone's location
 
-    if bDirectly:
-        return (sumlen, vecy.rotation_difference(sumvec))
+    Solved one hierarchy level at a time, so bones may be stored in any order.
+    '''
+    bones_total = len(parents)
+    world_rots = np.empty((bones_total, 3, 3))
+    heads = np.empty((bones_total, 3))
+
+    solved = parents < 0
+    world_rots[solved] = root_rot
+    heads[solved] = locs[solved]
+
+    level = ~solved & solved[np.maximum(parents, 0)]
+    while level.any():
+        bones = np.flatnonzero(level)
+        parent_rots = world_rots[parents[bones]]
 
-    vec_to_axis_vec(sumvec, axis_vec)
-    psk_bone.axis_vec = axis_vec
-    return (sumlen, vecy.rotation_difference(axis_vec))
+        heads[bones] = heads[parents[bones]] + np.einsum('nij,nj->ni', parent_rots, locs[bones])
+        world_rots[bones] = parent_rots @ local_rots[bones]
+
+        solved |= level
+        level = ~solved & solved[np.maximum(parents, 0)]
+
+    if not solved.all():
+        return None
+    return (world_rots, heads)
 
 
 def __pass(*args,**kwargs):
     pass
 
 
-def util_check_file_header(file, ftype):
-    header_bytes = file.read(32)
+def util_mesh_from_arrays(mesh_data, vertices, faces, face_materials, smooth = False):
+    '''Fill an empty mesh with triangles, like from_pydata(vertices, [], faces) but straight from (n, 3) arrays.'''
+    face_count = len(faces)
 
-    if len(header_bytes) < 32:
-        return False
+    mesh_data.vertices.add(len(vertices))
+    mesh_data.vertices.foreach_set("co", np.ascontiguousarray(vertices, dtype = np.float32).ravel())
 
-    if not header_bytes.startswith( PSKPSA_FILE_HEADER[ftype] ):
-        return False
+    mesh_data.loops.add(face_count * 3)
+    mesh_data.loops.foreach_set("vertex_index", np.ascontiguousarray(faces, dtype = np.int32).ravel())
 
-    return True
+    mesh_data.polygons.add(face_count)
+    mesh_data.polygons.foreach_set("loop_start", np.arange(0, face_count * 3, 3, dtype = np.int32))
+    if bpy.app.version < (4, 0, 0):
+        # read-only since 4.0, derived from loop_start
+        mesh_data.polygons.foreach_set("loop_total", np.full(face_count, 3, dtype = np.int32))
+    mesh_data.polygons.foreach_set("material_index", np.ascontiguousarray(face_materials, dtype = np.int32))
+    mesh_data.polygons.foreach_set("use_smooth", np.full(face_count, smooth, dtype = bool))
+
+    mesh_data.update(calc_edges = True)
+
+
+def util_uv_by_loop(wedge_uvs, loop_wedges):
+    '''Return (loops, 2) float32 coords of the loop wedges, V flipped to Blender's bottom-up UV space.'''
+    uvs = wedge_uvs[loop_wedges.ravel()]
+    uvs[:, 1] = 1.0 - uvs[:, 1]
+    return uvs
+
+
+def util_merge_weights(weights, vertices_total, max_influences = 0):
+    '''
+    Return (bone_indices, vertex_indices, weights) of the psk weights, sorted by bone and weight.
+
+    Repeated influences of a bone on a vertex are summed and clamped like vertex_group.add(..., 'ADD') does.
+    With max_influences > 0 only the strongest influences of each vertex are kept and renormalized.
+    '''
+    valid = (weights['point_index'] >= 0) & (weights['point_index'] < vertices_total)
+    bones = weights['bone_index'][valid]
+    vertices = weights['point_index'][valid]
+    values = weights['weight'][valid]
+
+    order = np.lexsort((vertices, bones))
+    bones, vertices, values = bones[order], vertices[order], values[order]
+    first = np.flatnonzero(np.append(True, (bones[1:] != bones[:-1]) | (vertices[1:] != vertices[:-1])))
+    if len(first) < len(values):
+        values = np.minimum(np.add.reduceat(values, first), np.float32(1.0))
+        bones, vertices = bones[first], vertices[first]
+
+    if max_influences > 0 and len(values):
+        order = np.lexsort((-values, vertices))
+        bones, vertices, values = bones[order], vertices[order], values[order]
+        vertex_start = np.flatnonzero(np.append(True, vertices[1:] != vertices[:-1]))
+        vertex_counts = np.diff(np.append(vertex_start, len(vertices)))
+        rank = np.arange(len(vertices)) - np.repeat(vertex_start, vertex_counts)
+        limited = np.repeat(vertex_counts > max_influences, vertex_counts)
+
+        keep = rank < max_influences
+        bones, vertices, values, limited = bones[keep], vertices[keep], values[keep], limited[keep]
+
+        totals = np.zeros(vertices_total, dtype = np.float32)
+        np.add.at(totals, vertices, values)
+        renormalize = limited & (totals[vertices] > 0)
+        values[renormalize] /= totals[vertices[renormalize]]
+
+        limited_total = np.count_nonzero(vertex_counts > max_influences)
+        if limited_total > 0:
+            print('Influence limit: %i vertices had more than %i bone influences.' % (limited_total, max_influences))
+
+    order = np.lexsort((vertices, values, bones))
+    return bones[order], vertices[order], values[order]
 
 
 def color_linear_to_srgb(c):
@@ -307,6 +527,10 @@ def color_linear_to_srgb(c):
     else:
         return 1.055 * pow(c, 1.0 / 2.4) - 0.055
 
+# byte color channel to float, converted to sRGB or as it is
+COLOR_SRGB_LUT = np.array([color_linear_to_srgb(i / 255) for i in range(256)], dtype = np.float32)
+COLOR_LINEAR_LUT = np.array([i / 255 for i in range(256)], dtype = np.float32)
+
 def pskimport(filepath,
         context = None,
         bImportmesh = True,
@@ -319,6 +543,8 @@ def pskimport(filepath,
         bReorientDirectly = False,
         bScaleDown = True,
         bToSRGB = True,
+        iMaxInfluences = 0,
+        morph_names = None,
         error_callback = None):
     '''
     Import mesh and skeleton from .psk/.pskx files
@@ -326,6 +552,12 @@ def pskimport(filepath,
     Args:
         bReorientBones:
             Axis based bone orientation to children
+
+        iMaxInfluences:
+            Keep only this many strongest bone influences per vertex and renormalize them. 0 - no limit.
+
+        morph_names:
+            Morph targets to import as shape keys, by name. None - all of them, empty list - none.
             
         error_callback:
             Called when importing is failed.
@@ -348,312 +580,54 @@ def pskimport(filepath,
 
     #file may not exist
     try:
-        file = open(filepath,'rb')
+        # skeleton only - skip the mesh chunks without reading them
+        psk = read_psk(filepath, error_callback, morph_names, None if bImportmesh else PSK_SKELETON_CHUNKS)
     except IOError:
         error_callback('Error while opening file for reading:\n  "'+filepath+'"')
         return False
-
-    if not util_check_file_header(file, 'psk'):
-        error_callback('Not psk file:\n  "'+filepath+'"')
+    except DecodeError as e:
+        error_callback(str(e))
         return False
 
-    Vertices = None
-    Wedges = None
-    Faces = None
-    UV_by_face = None
-    Materials = None
-    Bones = None
-    Weights = None
-    VertexColors = None
-    Extrauvs = []
-    Normals = None
-    WedgeIdx_by_faceIdx = None
-    MorphInfos = None
-    MorphDeltas = None
-
     if not context:
         context = bpy.context
-    #==================================================================================================
-    # Materials   MaterialNameRaw | TextureIndex | PolyFlags | AuxMaterial | AuxFlags |  LodBias | LodStyle 
-    # Only Name is usable.
-    def read_materials():
-
-        nonlocal Materials
-
-        Materials = []
-
-        for counter in range(chunk_datacount):
-
-            (MaterialNameRaw,) = unpack_from('64s24x', chunk_data, chunk_datasize * counter)
-
-            Materials.append( util_bytes_to_str( MaterialNameRaw ) )
-
-
-    #==================================================================================================
-    # Faces WdgIdx1 | WdgIdx2 | WdgIdx3 | MatIdx | AuxMatIdx | SmthGrp
-    def read_faces():
-
-        if not bImportmesh:
-            return True
-
-        nonlocal Faces, UV_by_face, WedgeIdx_by_faceIdx
-
-        UV_by_face = [None] * chunk_datacount
-        Faces = [None] * chunk_datacount
-        WedgeIdx_by_faceIdx = [None] * chunk_datacount
-
-        if len(Wedges) > 65536:
-            unpack_format = '=IIIBBI'
-        else:
-            unpack_format = '=HHHBBI'
-
-        unpack_data = Struct(unpack_format).unpack_from
-
-        for counter in range(chunk_datacount):
-            (WdgIdx1, WdgIdx2, WdgIdx3,
-             MatIndex,
-             AuxMatIndex, #unused
-             SmoothingGroup # Umodel is not exporting SmoothingGroups
-             ) = unpack_data(chunk_data, counter * chunk_datasize)
-
-            # looks ugly
-            # Wedges is (point_index, u, v, MatIdx)
-            ((vertid0, u0, v0, matid0), (vertid1, u1, v1, matid1), (vertid2, u2, v2, matid2)) = Wedges[WdgIdx1], Wedges[WdgIdx2], Wedges[WdgIdx3]
-
-            # note order: C,B,A
-            # Faces[counter] = (vertid2,  vertid1, vertid0)
-
-            Faces[counter] = (vertid1,  vertid0, vertid2)
-            # Faces[counter] = (vertid1,  vertid2, vertid0)
-            # Faces[counter] = (vertid0,  vertid1, vertid2)
-
-            # uv = ( ( u2, 1.0 - v2 ), ( u1, 1.0 - v1 ), ( u0, 1.0 - v0 ) )
-            uv = ( ( u1, 1.0 - v1 ), ( u0, 1.0 - v0 ), ( u2, 1.0 - v2 ) )
 
-            # Mapping: FaceIndex <=> UV data <=> FaceMatIndex
-            UV_by_face[counter] = (uv, MatIndex, (matid2, matid1, matid0))
+    Materials = psk.materials
+    Bones = psk.bones
+    Extrauvs = psk.extra_uvs
 
-            # We need this for EXTRA UVs
-            WedgeIdx_by_faceIdx[counter] = (WdgIdx3, WdgIdx2, WdgIdx1)
+    if psk.bones is None or len(psk.bones) == 0:
+        bImportbone = False
 
-
-    #==================================================================================================
-    # Vertices X | Y | Z
-    def read_vertices():
-
-        if not bImportmesh:
-            return True
-
-        nonlocal Vertices
-
-        Vertices = [None] * chunk_datacount
-
-        unpack_data = Struct('3f').unpack_from
+    if bImportmesh:
+        # Wedges is (point_index, uv, material_index)
+        Wedges = psk.wedges
+        Weights = psk.weights
+        VertexColors = psk.vertex_colors
+        Normals = psk.normals
+        MorphDeltas = psk.morph_deltas
 
         if bScaleDown:
-            for counter in range( chunk_datacount ):
-                (vec_x, vec_y, vec_z) = unpack_data(chunk_data, counter * chunk_datasize)
-                Vertices[counter]  = (vec_x*0.01, vec_y*0.01, vec_z*0.01)
-                # equal to gltf
-                # Vertices[counter]  = (vec_x*0.01, vec_z*0.01, -vec_y*0.01)
+            # scale in double precision, rounds the same as Blender storing vec_x*0.01
+            Vertices = np.multiply(psk.vertices, 0.01, dtype = np.float64).astype(np.float32)
+            # equal to gltf
+            # Vertices = Vertices[:, (0, 2, 1)] * (0.01, 0.01, -0.01)
         else:
-            for counter in range( chunk_datacount ):
-                Vertices[counter]  =  unpack_data(chunk_data, counter * chunk_datasize)
-
-
-    #==================================================================================================
-    # Wedges (UV)   VertexId |  U |  V | MatIdx 
-    def read_wedges():
+            Vertices = psk.vertices
 
-        if not bImportmesh:
-            return True
+        # Wedges per loop. note order: B,A,C
+        WedgeIdx_by_faceIdx = psk.face_wedges[:, (1, 0, 2)]
 
-        nonlocal Wedges
-
-        Wedges = [None] * chunk_datacount
-
-        unpack_data = Struct('=IffBxxx').unpack_from
-
-        for counter in range( chunk_datacount ):
-            (vertex_id,
-             u, v,
-             material_index) = unpack_data( chunk_data, counter * chunk_datasize )
-
-            # print(vertex_id, u, v, material_index)
-            # Wedges[counter] = (vertex_id, u, v, material_index)
-            Wedges[counter] = [vertex_id, u, v, material_index]
-
-    #==================================================================================================
-    # Bones (VBone .. VJointPos ) Name|Flgs|NumChld|PrntIdx|Qw|Qx|Qy|Qz|LocX|LocY|LocZ|Lngth|XSize|YSize|ZSize
-    def read_bones():
-
-        nonlocal Bones, bImportbone
-
-        if chunk_datacount == 0:
-            bImportbone = False
-
-        if bImportbone:
-            # unpack_data = Struct('64s3i11f').unpack_from
-            unpack_data = Struct('64s3i7f16x').unpack_from
-        else:
-            unpack_data = Struct('64s56x').unpack_from
-
-        Bones = [None] * chunk_datacount
-
-        for counter in range( chunk_datacount ):
-            Bones[counter] = unpack_data( chunk_data, chunk_datasize * counter)
-
-
-    #==================================================================================================
-    # Influences (Bone Weight) (VRawBoneInfluence) ( Weight | PntIdx | BoneIdx)
-    def read_weights():
-
-        nonlocal Weights
-
-        if not bImportmesh:
-            return True
-
-        Weights = [None] * chunk_datacount
-
-        unpack_data = Struct('fii').unpack_from
-
-        for counter in range(chunk_datacount):
-            Weights[counter] = unpack_data(chunk_data, chunk_datasize * counter)
-
-    #==================================================================================================
-    # Vertex colors. R G B A bytes. NOTE: it is Wedge color.(uses Wedges index)
-    def read_vertex_colors():
-
-        nonlocal VertexColors
-
-        unpack_data = Struct("=4B").unpack_from
-
-        VertexColors = [None] * chunk_datacount
-
-        for counter in range( chunk_datacount ):
-            VertexColors[counter] = unpack_data(chunk_data, chunk_datasize * counter)
-
-
-    #==================================================================================================
-    # Extra UV. U | V
-    def read_extrauvs():
+        Faces = Wedges['point_index'][WedgeIdx_by_faceIdx]
 
-        unpack_data = Struct("=2f").unpack_from
+        # Mapping: FaceIndex <=> FaceMatIndex
+        FaceMatIdx = psk.face_materials
 
-        uvdata = [None] * chunk_datacount
-
-        for counter in range( chunk_datacount ):
-            uvdata[counter] = unpack_data(chunk_data, chunk_datasize * counter)
-
-        Extrauvs.append(uvdata)
-
-    #==================================================================================================
-    # Vertex Normals NX | NY | NZ
-    def read_normals():
-        if not bImportmesh:
-            return True
-
-        nonlocal Normals
-        Normals = [None] * chunk_datacount
-
-        unpack_data = Struct('3f').unpack_from
-
-        for counter in range(chunk_datacount):
-            Normals[counter] = unpack_data(chunk_data, counter * chunk_datasize)
-
-    # ==================================================================================================
-    # Morph Info MorphName | VertexCount
-
-    def read_morph_info():
-        if not bImportmesh:
-            return True
-
-        nonlocal MorphInfos
-        MorphInfos = [None] * chunk_datacount
-
-        unpack_data = Struct('=64si').unpack_from
-
-        for counter in range(chunk_datacount):
-            MorphInfos[counter] = unpack_data(chunk_data, counter * chunk_datasize)
-
-    # ==================================================================================================
-    # Morph Data PosX | PosY | PosZ | NormX | NormY | NormZ | Point Index
-
-    def read_morph_data():
-        if not bImportmesh:
-            return True
-
-        nonlocal MorphDeltas
-        MorphDeltas = [None] * chunk_datacount
-
-        unpack_data = Struct('6fi').unpack_from
-
-        for counter in range(chunk_datacount):
-            MorphDeltas[counter] = unpack_data(chunk_data, counter * chunk_datasize)
-
-
-    CHUNKS_HANDLERS = {
-        'PNTS0000': read_vertices,
-        'VTXW0000': read_wedges,
-        'VTXW3200': read_wedges,#?
-        'FACE0000': read_faces,
-        'FACE3200': read_faces,
-        'MATT0000': read_materials,
-        'REFSKELT': read_bones,
-        'REFSKEL0': read_bones, #?
-        'RAWW0000': read_weights,
-        'RAWWEIGH': read_weights,
-        'VERTEXCO': read_vertex_colors, # VERTEXCOLOR
-        'EXTRAUVS': read_extrauvs,
-        'VTXNORMS': read_normals,
-        'MRPHINFO': read_morph_info,
-        'MRPHDATA': read_morph_data
-    }
-
-    #===================================================================================================
-    # File. Read all needed data.
-    #         VChunkHeader Struct
-    # ChunkID|TypeFlag|DataSize|DataCount
-    # 0      |1       |2       |3
-
-    while True:
-
-        header_bytes = file.read(32)
-
-        if len(header_bytes) < 32:
-
-            if len(header_bytes) != 0:
-                error_callback("Unexpected end of file.(%s/32 bytes)" % len(header_bytes))
-            break
-
-        (chunk_id, chunk_type, chunk_datasize, chunk_datacount) = unpack('20s3i', header_bytes)
-
-        chunk_id_str = util_bytes_to_str(chunk_id)
-        chunk_id_str = chunk_id_str[:8]
-
-        if chunk_id_str in CHUNKS_HANDLERS:
-
-            chunk_data = file.read( chunk_datasize * chunk_datacount)
-
-            if len(chunk_data) < chunk_datasize * chunk_datacount:
-                error_callback('Psk chunk %s is broken.' % chunk_id_str)
-                return False
-
-            CHUNKS_HANDLERS[chunk_id_str]()
-
-        else:
-
-            print('Unknown chunk: ', chunk_id_str)
-            file.seek(chunk_datasize * chunk_datacount, 1)
-
-
-        # print(chunk_id_str, chunk_datacount)
-
-    file.close()
+        UV_by_loop = util_uv_by_loop(Wedges['uv'], WedgeIdx_by_faceIdx)
 
     print(" Importing file:", filepath)
 
-    if not bImportmesh and (Bones is None or len(Bones) == 0):
+    if not bImportmesh and not bImportbone:
         error_callback("Psk: no skeleton data.")
         return False
 
@@ -680,39 +654,27 @@ def pskimport(filepath,
         if bSpltiUVdata:
         # store how much each "matrial index" have vertices
 
-            uv_mat_ids = {}
-
-            for (_, _, _, material_index) in Wedges:
-
-                if not (material_index in uv_mat_ids):
-                    uv_mat_ids[material_index] = 1
-                else:
-                    uv_mat_ids[material_index] += 1
+            uv_mat_ids, uv_mat_counts = np.unique(Wedges['material_index'], return_counts = True)
 
+            # UV map of every material index, in order by default
+            mat_idx_proxy = np.zeros(256, dtype = np.uint8)
+            mat_idx_proxy[uv_mat_ids] = np.arange(len(uv_mat_ids))
 
             # if we have more UV material indexes than blender UV maps, then...
-            if bSpltiUVdata and len(uv_mat_ids) > MAX_UVS :
+            if len(uv_mat_ids) > MAX_UVS:
 
                 uv_mat_ids_len = len(uv_mat_ids)
 
-                print('UVs: %s out of %s is combined in a first UV map(%s0)' % (uv_mat_ids_len - 8, uv_mat_ids_len, NAME_UV_PREFIX))
+                print('UVs: %s out of %s is combined in a first UV map(%s0)' % (uv_mat_ids_len - MAX_UVS + 1, uv_mat_ids_len, NAME_UV_PREFIX))
 
-                mat_idx_proxy = [0] * len(uv_mat_ids)
+                # most used material index gets the last UV map, the least used ones share the first
+                by_count = np.argsort(-uv_mat_counts, kind = 'stable')
+                mat_idx_proxy[uv_mat_ids[by_count]] = np.maximum(MAX_UVS - 1 - np.arange(uv_mat_ids_len), 0)
 
-                counts_sorted = sorted(uv_mat_ids.values(), reverse = True)
+            uv_layer_count = min(len(uv_mat_ids), MAX_UVS)
 
-                new_mat_index = MAX_UVS - 1
-
-                for c in counts_sorted:
-                    for mat_idx, counts in uv_mat_ids.items():
-                        if c == counts:
-                            mat_idx_proxy[mat_idx] = new_mat_index
-                            if new_mat_index > 0:
-                                new_mat_index -= 1
-                            # print('MatIdx remap: %s > %s' % (mat_idx,new_mat_index))
-
-                for i in range(len(Wedges)):
-                    Wedges[i][3] = mat_idx_proxy[Wedges[i][3]]
+            # UV map of every loop
+            UVLayerIdx_by_loop = mat_idx_proxy[Wedges['material_index']][WedgeIdx_by_faceIdx].ravel()
 
         # print('Wedges:', chunk_datacount)
         # print('uv_mat_ids', uv_mat_ids)
@@ -737,111 +699,59 @@ def pskimport(filepath,
 
     #==================================================================================================
     # Prepare bone data
-    def init_psk_bone(i, psk_bones, name_raw):
-        psk_bone = class_psk_bone()
-        psk_bone.children = []
-        psk_bone.name = util_bytes_to_str(name_raw)
-        psk_bones[i] = psk_bone
-        return psk_bone
-
-    psk_bone_name_toolong = False
 
     # indexed by bone index. array of psk_bone
-    psk_bones = [None] * len(Bones)
-
-    if not bImportbone: #data needed for mesh-only import
-
-        for counter,(name_raw,) in enumerate(Bones):
-            init_psk_bone(counter, psk_bones, name_raw)
-
-    if bImportbone:  #else?
-
-        # average bone length
-        sum_bone_pos = 0
-
-        for counter, (name_raw, flags, NumChildren, ParentIndex, #0 1 2 3
-             quat_x, quat_y, quat_z, quat_w,            #4 5 6 7
-             vec_x, vec_y, vec_z
-            #  ,                       #8 9 10
-            #  joint_length,                              #11
-            #  scale_x, scale_y, scale_z
-             ) in enumerate(Bones):
-
-            psk_bone = init_psk_bone(counter, psk_bones, name_raw)
+    psk_bones = [class_psk_bone(name, counter) for counter, name in enumerate(psk.bone_names)]
 
-            psk_bone.bone_index = counter
-            psk_bone.parent_index = ParentIndex
+    if bImportbone:  #else? data needed for mesh-only import is just the names
 
-            # Tested. 64 is getting cut to 63
-            if len(psk_bone.name) > 63:
-                psk_bone_name_toolong = True
-                # print('Warning. Bone name is too long:', psk_bone.name)
+        # Tested. 64 is getting cut to 63
+        psk_bone_name_toolong = any(len(name) > 63 for name in psk.bone_names)
 
-            # make sure we have valid parent_index
-            if psk_bone.parent_index < 0:
-                psk_bone.parent_index = 0
+        # root is -1, other invalid parent indices point to bone 0
+        BoneParents = util_bone_parents(Bones['parent_index'])
 
-            # psk_bone.scale = (scale_x, scale_y, scale_z)
-            # print("%s: %03f %03f | %f" % (psk_bone.name, scale_x, scale_y, joint_length),scale_x)
-            # print("%s:" % (psk_bone.name), vec_x, quat_x)
+        # store bind pose to make it available for psa-import via CustomProperty of the Blender bone
+        if bScaleDown:
+            # scale in double precision, rounds the same as Blender storing vec_x*0.01
+            BoneLocs = np.multiply(Bones['loc'], 0.01, dtype = np.float64).astype(np.float32)
+        else:
+            BoneLocs = Bones['loc']
 
-            # store bind pose to make it available for psa-import via CustomProperty of the Blender bone
-            psk_bone.orig_quat = Quaternion((quat_w, quat_x, quat_y, quat_z))
+        # x,y,z,w -> w,x,y,z
+        BoneQuats = Bones['quat'][:, (3, 0, 1, 2)]
 
-            if bScaleDown:
-                psk_bone.orig_loc = Vector((vec_x * 0.01, vec_y * 0.01, vec_z * 0.01))
-            else:
-                psk_bone.orig_loc = Vector((vec_x, vec_y, vec_z))
+        for psk_bone, quat, loc, parent_index in zip(psk_bones, BoneQuats.tolist(), BoneLocs.tolist(), BoneParents.tolist()):
+            psk_bone.orig_quat = Quaternion(quat)
+            psk_bone.orig_loc = Vector(loc)
 
-            # root bone must have parent_index = 0 and selfindex = 0
-            if psk_bone.parent_index == 0 and psk_bone.bone_index == psk_bone.parent_index:
-                if bDontInvertRoot:
-                    psk_bone.mat_world_rot = psk_bone.orig_quat.to_matrix()
-                else:
-                    psk_bone.mat_world_rot = psk_bone.orig_quat.conjugated().to_matrix()
-                psk_bone.mat_world = Matrix.Translation(psk_bone.orig_loc)
+            if parent_index >= 0:
+                psk_bone.parent_index = parent_index
+                psk_bone.parent = psk_bones[parent_index]
+                psk_bone.parent.children.append(psk_bone)
 
-            sum_bone_pos += psk_bone.orig_loc.length
+        # average bone length
+        sum_bone_pos = sum(util_vec_lengths(BoneLocs).tolist())
 
 
     #==================================================================================================
     # Bones. Calc World-space matrix
 
-        # TODO optimize math.
-        for psk_bone in psk_bones:
-
-            if psk_bone.parent_index == 0:
-                if psk_bone.bone_index == 0:
-                    psk_bone.parent = None
-                    continue
-
-            parent = psk_bones[psk_bone.parent_index]
-
-            psk_bone.parent = parent
+        # mat_world_rot - world space bone rotation WITH own rotation
+        # conjugated orig_quat is the rotation relative to the parent
+        BoneConjQuats = BoneQuats * np.array((1.0, -1.0, -1.0, -1.0), dtype = np.float32)
+        root_rot = util_quat_to_matrix(BoneQuats[0] if bDontInvertRoot else BoneConjQuats[0])
 
-            parent.children.append(psk_bone)
-
-            # mat_world -     world space bone matrix WITHOUT own rotation
-            # mat_world_rot - world space bone rotation WITH own rotation
-
-            # psk_bone.mat_world = parent.mat_world_rot.to_4x4()
-            # psk_bone.mat_world.translation = parent.mat_world.translation + parent.mat_world_rot * psk_bone.orig_loc
-            # psk_bone.mat_world_rot = parent.mat_world_rot * psk_bone.orig_quat.conjugated().to_matrix()
-
-            psk_bone.mat_world = parent.mat_world_rot.to_4x4()
-
-            v = psk_bone.orig_loc.copy()
-            v.rotate( parent.mat_world_rot )
-            psk_bone.mat_world.translation = parent.mat_world.translation + v
-
-
-            psk_bone.mat_world_rot = psk_bone.orig_quat.conjugated().to_matrix()
-            psk_bone.mat_world_rot.rotate( parent.mat_world_rot )
+        solved = util_solve_bone_world(BoneParents, util_quat_to_matrix(BoneConjQuats), BoneLocs, root_rot)
+        if solved is None:
+            error_callback("Psk: broken bone hierarchy.\nSome bones are not connected to the root bone.")
+            return False
 
+        (BoneWorldRots, BoneHeads) = solved
 
-            # psk_bone.mat_world =  ( parent.mat_world_rot.to_4x4() * psk_bone.trans)
-            # psk_bone.mat_world.translation += parent.mat_world.translation
-            # psk_bone.mat_world_rot = parent.mat_world_rot * psk_bone.orig_quat.conjugated().to_matrix()
+        # mat_world - world space bone matrix WITHOUT own rotation, so the parent's rotation
+        BoneHeadRots = BoneWorldRots[np.maximum(BoneParents, 0)]
+        BoneHeadRots[BoneParents < 0] = np.identity(3)
 
 
     #==================================================================================================
@@ -872,114 +782,82 @@ def pskimport(filepath,
         # bone_size_choosen = max(0.01, min(sum_bone_pos, fBonesize))
         # print("Bonesize %f | old: %f round: %f" % (bone_size_choosen, max(0.01, min(sum_bone_pos, fBonesize)),max(0.01, round((min(sum_bone_pos, fBonesize))*100)/100)))
 
-        if not bReorientBones:
-            new_bone_size = bone_size_choosen
+        if bDontInvertRoot:
+            psk_bones[0].orig_quat.conjugate()
 
     #==================================================================================================
-    # Skeleton. Build.
-        if psk_bone_name_toolong:
-            print('Warning. Some bones will be renamed(names are too long). Animation import may be broken.')
-            for psk_bone in psk_bones:
+    # Skeleton. Orient.
 
-                # TODO too long name cutting options?
-                orig_long_name = psk_bone.name
+        if bReorientBones:
+            (bone_sizes, BoneVecYs, BoneTargets) = calc_bone_rotations(BoneParents, BoneLocs, BoneQuats,
+                    bone_size_choosen, bReorientDirectly, sum_bone_pos)
 
-                # Blender will cut the name here (>63 chars)
-                edit_bone = armature_obj.data.edit_bones.new(psk_bone.name)
-                edit_bone["orig_long_name"] = orig_long_name
-
-                # if orig_long_name != edit_bone.name:
-                #     print('--')
-                #     print(len(orig_long_name),orig_long_name)
-                #     print(len(edit_bone.name),edit_bone.name)
-
-                # Use the bone name made by blender (.001 , .002 etc.)
-                psk_bone.name = edit_bone.name
-
-        else:
-            for psk_bone in psk_bones:
-                edit_bone = armature_obj.data.edit_bones.new(psk_bone.name)
-                psk_bone.name = edit_bone.name
-
-        for psk_bone in psk_bones:
-            edit_bone = armature_obj.data.edit_bones[psk_bone.name]
-
-            armature_obj.data.edit_bones.active = edit_bone
-
-            if psk_bone.parent is not None:
-                edit_bone.parent = armature_obj.data.edit_bones[psk_bone.parent.name]
-            else:
-                if bDontInvertRoot:
-                    psk_bone.orig_quat.conjugate()
-
-            if bReorientBones:
-                (new_bone_size, quat_orient_diff) = calc_bone_rotation(psk_bone, bone_size_choosen, bReorientDirectly, sum_bone_pos)
+            post_quats = []
+            for psk_bone, vecy, target in zip(psk_bones, BoneVecYs.tolist(), BoneTargets.tolist()):
                 # @
                 # post_quat = psk_bone.orig_quat.conjugated() * quat_orient_diff
 
-                post_quat = quat_orient_diff
+                post_quat = Vector(vecy).rotation_difference(Vector(target))
                 post_quat.rotate( psk_bone.orig_quat.conjugated() )
-            else:
-                post_quat = psk_bone.orig_quat.conjugated()
-
-            # only length of this vector is matter?
-            edit_bone.tail = Vector(( 0.0, new_bone_size, 0.0))
-
-            # @
-            # edit_bone.matrix = psk_bone.mat_world * post_quat.to_matrix().to_4x4()
-
-            m = post_quat.copy()
-            m.rotate( psk_bone.mat_world )
-
-            m = m.to_matrix().to_4x4()
-            m.translation = psk_bone.mat_world.translation
-
-            edit_bone.matrix = m
+                post_quats.append(post_quat)
 
+            BoneSizes = bone_sizes.astype(np.float32)
+            BonePostQuats = np.array(post_quats, dtype = np.float32)
+        else:
+            BoneSizes = np.full(len(psk_bones), bone_size_choosen, dtype = np.float32)
+            BonePostQuats = BoneQuats.copy()
+            BonePostQuats[1:] = BoneConjQuats[1:]
+            if not bDontInvertRoot:
+                BonePostQuats[0] = BoneConjQuats[0]
+            post_quats = [Quaternion(quat) for quat in BonePostQuats.tolist()]
+
+        # @
+        # edit_bone.matrix = psk_bone.mat_world * post_quat.to_matrix().to_4x4()
+        BoneMatrices = np.zeros((len(psk_bones), 4, 4))
+        BoneMatrices[:, :3, :3] = BoneHeadRots @ util_quat_to_matrix(BonePostQuats)
+        BoneMatrices[:, :3, 3] = BoneHeads
+        BoneMatrices[:, 3, 3] = 1.0
 
-            # some dev code...
-            #### FINAL
-            # post_quat = psk_bone.orig_quat.conjugated() * quat_diff
-            # edit_bone.matrix = psk_bone.mat_world * test_quat.to_matrix().to_4x4()
-            # edit_bone["post_quat"] = test_quat
-            #### 
+    #==================================================================================================
+    # Skeleton. Build.
+        if psk_bone_name_toolong:
+            print('Warning. Some bones will be renamed(names are too long). Animation import may be broken.')
 
-            # edit_bone["post_quat"] = Quaternion((1,0,0,0))
-            # edit_bone.matrix = psk_bone.mat_world* psk_bone.rot
+        edit_bones = armature_obj.data.edit_bones
+        edit_bone_list = []
 
+        for psk_bone, post_quat in zip(psk_bones, post_quats):
+            # TODO too long name cutting options?
+            # Blender will cut the name here (>63 chars)
+            edit_bone = edit_bones.new(psk_bone.name)
 
-            # if edit_bone.parent:
-              # edit_bone.matrix = edit_bone.parent.matrix * psk_bone.trans * (psk_bone.orig_quat.conjugated().to_matrix().to_4x4())
-              # edit_bone.matrix = edit_bone.parent.matrix * psk_bone.trans * (test_quat.to_matrix().to_4x4())
-            # else:
-              # edit_bone.matrix = psk_bone.orig_quat.to_matrix().to_4x4()
+            if psk_bone_name_toolong:
+                edit_bone["orig_long_name"] = psk_bone.name
 
+            # Use the bone name made by blender (.001 , .002 etc.)
+            psk_bone.name = edit_bone.name
 
             # save bindPose information for .psa import
-            # dev
             edit_bone["orig_quat"] = psk_bone.orig_quat
             edit_bone["orig_loc"]  = psk_bone.orig_loc
             edit_bone["post_quat"] = post_quat
 
-            '''
-            bone = edit_bone
-            if psk_bone.parent is not None:
-                orig_loc  =  bone.matrix.translation - bone.parent.matrix.translation
-                orig_loc.rotate( bone.parent.matrix.to_quaternion().conjugated() )
+            edit_bone_list.append(edit_bone)
 
-                
-                orig_quat = bone.matrix.to_quaternion()
-                orig_quat.rotate( bone.parent.matrix.to_quaternion().conjugated()  )
-                orig_quat.conjugate()
+        for edit_bone, parent_index in zip(edit_bone_list, BoneParents.tolist()):
+            if parent_index >= 0:
+                edit_bone.parent = edit_bone_list[parent_index]
 
-                if orig_quat.dot( psk_bone.orig_quat ) < 0.95:
-                    print(bone.name, psk_bone.orig_quat, orig_quat, orig_quat.dot( psk_bone.orig_quat ))
-                    print('parent:', bone.parent.matrix.to_quaternion(), bone.parent.matrix.to_quaternion().rotation_difference(bone.matrix.to_quaternion()) )
+        if edit_bone_list:
+            edit_bones.active = edit_bone_list[-1]
 
+        # only length of this vector is matter? matrix keeps the head-tail length
+        BoneTails = np.zeros((len(psk_bones), 3), dtype = np.float32)
+        BoneTails[:, 1] = BoneSizes
+        edit_bones.foreach_set("tail", BoneTails.ravel())
+        # flat matrices are column major
+        edit_bones.foreach_set("matrix", BoneMatrices.transpose(0, 2, 1).astype(np.float32).ravel())
 
-                if (psk_bone.orig_loc - orig_loc).length > 0.02:
-                    print(bone.name, psk_bone.orig_loc, orig_loc, (psk_bone.orig_loc - orig_loc).length)
-            '''
     utils_set_mode('OBJECT')
 
     #==================================================================================================
@@ -988,15 +866,10 @@ def pskimport(filepath,
 
         vertices_total = len(Vertices)
 
-        for ( _, PointIndex, BoneIndex ) in Weights:
-            if PointIndex < vertices_total: # can it be not?
-                psk_bones[BoneIndex].have_weight_data = True
-            # else:
-                # print(psk_bones[BoneIndex].name, 'for other mesh',PointIndex ,vertices_total)
+        WeightBones, WeightVertices, WeightValues = util_merge_weights(Weights, vertices_total, iMaxInfluences)
 
-            #print("weight:", PointIndex, BoneIndex, Weight)
-        # Weights.append(None)
-        # print(Weights.count(None))
+        for BoneIndex in np.unique(WeightBones).tolist():
+            psk_bones[BoneIndex].have_weight_data = True
 
 
     # Original vertex colorization code
@@ -1056,7 +929,7 @@ def pskimport(filepath,
 
         if bSpltiUVdata:
 
-            for i in range(len(uv_mat_ids)):
+            for i in range(uv_layer_count):
                 get_uv_layers(mesh_data).new(name = NAME_UV_PREFIX + str(i))
 
         else:
@@ -1064,34 +937,37 @@ def pskimport(filepath,
             get_uv_layers(mesh_data).new(name = NAME_UV_PREFIX+"_SINGLE")
 
 
+        extrauvs_used = []
+
         for counter, uv_data in enumerate(Extrauvs):
 
             if len(mesh_data.uv_layers) < MAX_UVS:
 
                 get_uv_layers(mesh_data).new(name = "EXTRAUVS"+str(counter))
+                extrauvs_used.append(uv_data)
 
             else:
 
-                Extrauvs.remove(uv_data)
                 print('Extra UV layer %s is ignored. Re-import without "Split UV data".' % counter)
 
+        Extrauvs = extrauvs_used
+
     #==================================================================================================
     # Mesh. Build.
 
-        mesh_data.from_pydata(Vertices,[],Faces)
+        util_mesh_from_arrays(mesh_data, Vertices, Faces, FaceMatIdx, smooth = Normals is not None)
 
     #==================================================================================================
     # Vertex Normal. Set.
 
         if Normals is not None:
-            mesh_data.polygons.foreach_set("use_smooth", [True] * len(mesh_data.polygons))
             mesh_data.normals_split_custom_set_from_vertices(Normals)
             mesh_data.use_auto_smooth = True
 
     # ==================================================================================================
     # Morph Target. Set.
 
-        if MorphInfos is not None:
+        if psk.morph_vertex_counts is not None:
             default_key = mesh_obj.shape_key_add(name="Default", from_mix=False)
             default_key.interpolation = 'KEY_LINEAR'
 
@@ -1099,15 +975,24 @@ def pskimport(filepath,
 
             scale = 0.01 if bScaleDown else 1.00
 
-            for (morph_name, vertex_count) in MorphInfos:
-                key = mesh_obj.shape_key_add(name=util_bytes_to_str(morph_name), from_mix=False)
+            # scaled and Y flipped like the vertices, in double precision before storing as float
+            MorphOffsets = (MorphDeltas['position_delta'] * np.array((scale, -scale, scale))).astype(np.float32)
+            # is there nowhere to add normal delta ??? normals will be unused for now ig
+
+            basis_co = np.empty(len(Vertices) * 3, dtype = np.float32)
+            default_key.data.foreach_get("co", basis_co)
+            basis_co = basis_co.reshape(-1, 3)
+
+            for (morph_name, vertex_count) in zip(psk.morph_names, psk.morph_vertex_counts.tolist()):
+                key = mesh_obj.shape_key_add(name=morph_name, from_mix=False)
                 key.interpolation = 'KEY_LINEAR'
 
-                for i in range(morph_data_position, morph_data_position+vertex_count):
-                    (pos_x, pos_y, pos_z, norm_x, norm_y, norm_z, index) = MorphDeltas[i]
+                morph_slice = slice(morph_data_position, morph_data_position + vertex_count)
 
-                    key.data[index].co += Vector((pos_x*scale, -pos_y*scale, pos_z*scale))
-                    # is there nowhere to add normal delta ??? normals will be unused for now ig
+                key_co = basis_co.copy()
+                # unbuffered, so repeated indices add up like they did one by one
+                np.add.at(key_co, MorphDeltas['point_index'][morph_slice], MorphOffsets[morph_slice])
+                key.data.foreach_set("co", key_co.ravel())
 
                 morph_data_position += vertex_count
 
@@ -1117,26 +1002,15 @@ def pskimport(filepath,
 
     if bImportmesh:
 
-        for face in mesh_data.polygons:
-            face.material_index = UV_by_face[face.index][1]
-
         uv_layers = mesh_data.uv_layers
 
-        if not bSpltiUVdata:
-           uvLayer = uv_layers[0]
-
-        # per face
-        # for faceIdx, (faceUVs, faceMatIdx, _, _, wmidx) in enumerate(UV_by_face):
-        for faceIdx, (faceUVs, faceMatIdx, WedgeMatIds) in enumerate(UV_by_face):
-
-            # per vertex
-            for vertN, uv in enumerate(faceUVs):
-                loopId = faceIdx * 3 + vertN
-
-                if bSpltiUVdata:
-                    uvLayer = uv_layers[WedgeMatIds[vertN]]
-
-                uvLayer.data[loopId].uv = uv
+        if bSpltiUVdata:
+            # every UV map gets the coords of its own loops, the rest stay (0,0)
+            for i in range(uv_layer_count):
+                uv_data = np.where((UVLayerIdx_by_loop == i)[:, None], UV_by_loop, np.float32(0.0))
+                uv_layers[i].data.foreach_set("uv", uv_data.ravel())
+        else:
+            uv_layers[0].data.foreach_set("uv", UV_by_loop.ravel())
 
     #==================================================================================================
     # VertexColors
@@ -1145,38 +1019,31 @@ def pskimport(filepath,
 
             vtx_color_layer = mesh_data.vertex_colors.new(name = "PSKVTXCOL_0", do_init = False)
 
-            pervertex = [None] * len(Vertices)
+            # wedges of a vertex one after the other, in file order
+            wedge_order = np.argsort(Wedges['point_index'], kind = 'stable')
+            wedge_vertices = Wedges['point_index'][wedge_order]
+            wedge_colors = VertexColors[wedge_order]
 
-            for counter, (vertexid,_,_,_) in enumerate(Wedges):
+            same_vertex = wedge_vertices[1:] == wedge_vertices[:-1]
 
-                # Is it possible ?
-                if (pervertex[vertexid] is not None) and (pervertex[vertexid] != VertexColors[counter]):
-                    print('Not equal vertex colors. ', vertexid, pervertex[vertexid], VertexColors[counter])
+            # Is it possible ?
+            conflicts = np.count_nonzero(same_vertex & np.any(wedge_colors[1:] != wedge_colors[:-1], axis = 1))
+            if conflicts:
+                print('Not equal vertex colors: %i wedges differ from the previous wedge of their vertex, the last one is used.' % conflicts)
 
-                pervertex[vertexid] = VertexColors[counter]
+            # like Wedges the last wedge of a vertex wins
+            last_wedge = np.append(~same_vertex, True)
 
+            if bToSRGB:
+                color_lut = COLOR_SRGB_LUT
+            else:
+                color_lut = COLOR_LINEAR_LUT
 
-            for counter, loop in enumerate(mesh_data.loops):
+            pervertex = np.ones((len(Vertices), 4), dtype = np.float32)
+            pervertex[wedge_vertices[last_wedge], :3] = color_lut[wedge_colors[last_wedge, :3]]
+            pervertex[wedge_vertices[last_wedge], 3] = COLOR_LINEAR_LUT[wedge_colors[last_wedge, 3]]
 
-                color = pervertex[ loop.vertex_index ]
-
-                if color is None:
-                    vtx_color_layer.data[ counter ].color = (1.,1.,1.,1.)
-                else:
-                    if bToSRGB:
-                        vtx_color_layer.data[ counter ].color = (
-                            color_linear_to_srgb(color[0] / 255),
-                            color_linear_to_srgb(color[1] / 255),
-                            color_linear_to_srgb(color[2] / 255),
-                            color[3] / 255
-                        )
-                    else:
-                        vtx_color_layer.data[ counter ].color = (
-                            color[0] / 255,
-                            color[1] / 255,
-                            color[2] / 255,
-                            color[3] / 255
-                        )
+            vtx_color_layer.data.foreach_set("color", pervertex[Faces.ravel()].ravel())
 
     #===================================================================================================
     # Extra UVs. Set.
@@ -1194,15 +1061,8 @@ def pskimport(filepath,
 
             uvLayer = mesh_data.uv_layers[ counter - len(Extrauvs) ]
 
-            for faceIdx, (WedgeIdx3,WedgeIdx2,WedgeIdx1) in enumerate(WedgeIdx_by_faceIdx):
-
-                # equal to gltf
-                uvLayer.data[faceIdx*3  ].uv = (uv_data[WedgeIdx2][0], 1.0 - uv_data[WedgeIdx2][1])
-                uvLayer.data[faceIdx*3+1].uv = (uv_data[WedgeIdx1][0], 1.0 - uv_data[WedgeIdx1][1])
-                uvLayer.data[faceIdx*3+2].uv = (uv_data[WedgeIdx3][0], 1.0 - uv_data[WedgeIdx3][1])
-                # uvLayer.data[faceIdx*3  ].uv = (uv_data[WedgeIdx3][0], 1.0 - uv_data[WedgeIdx3][1])
-                # uvLayer.data[faceIdx*3+1].uv = (uv_data[WedgeIdx2][0], 1.0 - uv_data[WedgeIdx2][1])
-                # uvLayer.data[faceIdx*3+2].uv = (uv_data[WedgeIdx1][0], 1.0 - uv_data[WedgeIdx1][1])
+            # equal to gltf
+            uvLayer.data.foreach_set("uv", util_uv_by_loop(uv_data, WedgeIdx_by_faceIdx).ravel())
 
 
     #===================================================================================================
@@ -1214,8 +1074,11 @@ def pskimport(filepath,
             # else:
                 # print(psk_bone.name, 'have no influence on this mesh')
 
-        for weight, vertex_id, bone_index_w in filter(None, Weights):
-            psk_bones[bone_index_w].vertex_group.add((vertex_id,), weight, 'ADD')
+        # one call per run of equal weights of a bone
+        run_start = np.flatnonzero(np.append(True, (WeightBones[1:] != WeightBones[:-1]) | (WeightValues[1:] != WeightValues[:-1])))
+        run_end = np.append(run_start[1:], len(WeightBones))
+        for start, end in zip(run_start.tolist(), run_end.tolist()):
+            psk_bones[int(WeightBones[start])].vertex_group.add(WeightVertices[start:end].tolist(), float(WeightValues[start]), 'REPLACE')
 
 
     #===================================================================================================
@@ -1325,6 +1188,74 @@ def blen_get_armature_from_selection():
   return armature_obj
 
 
+class class_psa_anim:
+    """Decoded .psa file, the same for every armature it is applied to"""
+    __slots__ = ('filepath', 'bone_names', 'actions', 'raw_keys', 'raw_scale_keys', 'nbytes')
+
+    def __init__(self, filepath, psa):
+        self.filepath = filepath
+        self.bone_names = tuple(psa.bone_names)
+        # (Name, Group, Totalbones, NumRawFrames) per action
+        self.actions = tuple(zip(psa.action_names, psa.action_groups,
+                                 psa.actions['total_bones'].tolist(), psa.actions['num_raw_frames'].tolist()))
+
+        # Raw keys (VQuatAnimKey) position, w,x,y,z per key, not scaled down
+        self.raw_keys = np.empty((len(psa.keys), 7), dtype = np.float32)
+        self.raw_keys[:, :3] = psa.keys['position']
+        self.raw_keys[:, 3:] = psa.keys['orientation'][:, (3, 0, 1, 2)]
+        self.raw_keys.setflags(write = False)
+
+        # Raw scale keys (VScaleAnimKey) 3f vec
+        self.raw_scale_keys = None
+
+        if psa.scale_keys is not None and len(psa.scale_keys) > 0:
+            # copied, the cache must not keep the file mapped
+            self.raw_scale_keys = np.array(psa.scale_keys['scale'], dtype = np.float32)
+            self.raw_scale_keys.setflags(write = False)
+
+        # memory held by the keys, what the cache is limited by
+        self.nbytes = self.raw_keys.nbytes + (self.raw_scale_keys.nbytes if self.raw_scale_keys is not None else 0)
+
+
+# decoded .psa files by (path, mtime, size), the most recently used last,
+# the oldest are dropped once their keys take more than PSA_CACHE_BYTES
+PSA_CACHE_BYTES = 256 * 1024 * 1024
+psa_cache = {}
+
+def psa_read_cached(filepath, error_callback = print):
+    """Return the class_psa_anim of 'filepath', decoding it only if it isn't cached or changed on disk since
+
+    Returns None when the file can't be read or decoded.
+    """
+    try:
+        stat = os.stat(filepath)
+        key = (os.path.abspath(filepath), stat.st_mtime_ns, stat.st_size)
+
+        psa_anim = psa_cache.pop(key, None)
+        if psa_anim is None:
+            psa_anim = class_psa_anim(filepath, read_psa(filepath, error_callback))
+
+            # older versions of the file
+            for stale_key in [cached_key for cached_key in psa_cache if cached_key[0] == key[0]]:
+                del psa_cache[stale_key]
+    except IOError:
+        error_callback('Error while opening file for reading:\n  "'+filepath+'"')
+        return None
+    except DecodeError as e:
+        error_callback(str(e))
+        return None
+
+    # bigger than the whole cache, used once and not kept
+    if psa_anim.nbytes > PSA_CACHE_BYTES:
+        return psa_anim
+
+    psa_cache[key] = psa_anim
+    while sum(cached.nbytes for cached in psa_cache.values()) > PSA_CACHE_BYTES:
+        del psa_cache[next(iter(psa_cache))]
+
+    return psa_anim
+
+
 def psaimport(filepath,
         context = None,
         oArmature = None,
@@ -1355,11 +1286,8 @@ def psaimport(filepath,
     print ("---------EXECUTING PSA PYTHON IMPORTER---------")
     print ("-----------------------------------------------")
 
-    file_ext = 'psa'
-    try:
-        psafile = open(filepath, 'rb')
-    except IOError:
-        error_callback('Error while opening file for reading:\n  "'+filepath+'"')
+    psa_anim = psa_read_cached(filepath, error_callback)
+    if psa_anim is None:
         return False
 
     print ("Importing file: ", filepath)
@@ -1376,35 +1304,53 @@ def psaimport(filepath,
             error_callback("No armature selected.")
             return False
 
+    return psa_apply(psa_anim, context, armature_obj,
+        bFilenameAsPrefix = bFilenameAsPrefix,
+        bActionsToTrack = bActionsToTrack,
+        first_frames = first_frames,
+        bDontInvertRoot = bDontInvertRoot,
+        bUpdateTimelineRange = bUpdateTimelineRange,
+        bRotationOnly = bRotationOnly,
+        bScaleDown = bScaleDown,
+        fcurve_interpolation = fcurve_interpolation,
+        error_callback = error_callback
+        )
 
-    chunk_id = None
-    chunk_type = None
-    chunk_datasize = None
-    chunk_datacount = None
-    chunk_data = None
 
-    def read_chunk():
-        nonlocal chunk_id, chunk_type,\
-                 chunk_datasize, chunk_datacount,\
-                 chunk_data
+def psaimport_armatures(filepath, armatures, context = None, **kwargs):
+    """Import animation data from 'filepath' onto every armature of 'armatures', decoding the file once
 
-        (chunk_id, chunk_type,
-         chunk_datasize, chunk_datacount) = unpack('20s3i', psafile.read(32))
+    Takes the options of psaimport. Returns the first imported action per armature, False where it failed.
+    """
+    psa_anim = psa_read_cached(filepath, kwargs.get('error_callback', print))
+    if psa_anim is None:
+        return [False] * len(armatures)
 
-        chunk_data = psafile.read(chunk_datacount * chunk_datasize)
-    #==============================================================================================
-    # General Header
-    #==============================================================================================
-    read_chunk()
+    print ("Importing file: ", filepath)
+
+    if not context:
+        context = bpy.context
+
+    return [psa_apply(psa_anim, context, armature_obj, **kwargs) for armature_obj in armatures]
+
+
+def psa_apply(psa_anim, context, armature_obj,
+        bFilenameAsPrefix = False,
+        bActionsToTrack = False,
+        first_frames = 0,
+        bDontInvertRoot = True,
+        bUpdateTimelineRange = False,
+        bRotationOnly = False,
+        bScaleDown = True,
+        fcurve_interpolation = 'LINEAR',
+        error_callback = print
+        ):
+    """Create the actions of the decoded 'psa_anim' on 'armature_obj', see psaimport for the options"""
 
-    if not util_is_header_valid(filepath, file_ext, chunk_id, error_callback):
-        return False
 
     #==============================================================================================
     # Bones (FNamedBoneBinary)
     #==============================================================================================
-    read_chunk()
-
     psa_bones = {}
 
     def new_psa_bone(bone, pose_bone):
@@ -1450,10 +1396,10 @@ def psaimport(filepath,
         return psa_bone
 
     #Bones Data
-    BoneIndex2Name = [None] * chunk_datacount
+    BoneIndex2Name = [None] * len(psa_anim.bone_names)
     BoneNotFoundList = []
     BonesWithoutAnimation = []
-    PsaBonesToProcess = [None] * chunk_datacount
+    PsaBonesToProcess = [None] * len(psa_anim.bone_names)
     BonePsaImportedNames = []
 
     # printlog("Name\tFlgs\tNumChld\tPrntIdx\tQx\tQy\tQz\tQw\tLocX\tLocY\tLocZ\tLength\tXSize\tYSize\tZSize\n")
@@ -1468,13 +1414,8 @@ def psaimport(filepath,
       skeleton_bones_lowered[blender_bone_name.lower()] = blender_bone_name
 
 
-    for counter in range(chunk_datacount):
-
-        # tPrntIdx is -1 for parent; and 0 for other; no more useful data
-        # indata = unpack_from('64s3i11f', chunk_data, chunk_datasize * counter)
-        (indata) = unpack_from('64s56x', chunk_data, chunk_datasize * counter)
-        in_name = util_bytes_to_str(indata[0])
-        # bonename = util_bytes_to_str(indata[0]).upper()
+    # tPrntIdx is -1 for parent; and 0 for other; no more useful data
+    for counter, in_name in enumerate(psa_anim.bone_names):
 
         in_name_lowered = in_name.lower()
         if in_name_lowered in skeleton_bones_lowered:
@@ -1525,86 +1466,39 @@ def psaimport(filepath,
     #==============================================================================================
     # Animations (AniminfoBinary)
     #==============================================================================================
-    read_chunk()
-
-    Raw_Key_Nums = 0
-    Action_List = [None] * chunk_datacount
-
-    for counter in range(chunk_datacount):
-        (action_name_raw,        #0
-         group_name_raw,         #1
-         Totalbones,             #2
-         RootInclude,            #3
-         KeyCompressionStyle,    #4
-         KeyQuotum,              #5
-         KeyReduction,           #6
-         TrackTime,              #7
-         AnimRate,               #8
-         StartBone,              #9
-         FirstRawFrame,          #10
-         NumRawFrames            #11
-        ) = unpack_from('64s64s4i3f3i', chunk_data, chunk_datasize * counter)
-
-        action_name = util_bytes_to_str( action_name_raw )
-        group_name = util_bytes_to_str( group_name_raw  )
-
-        Raw_Key_Nums += Totalbones * NumRawFrames
-        Action_List[counter] = ( action_name, group_name, Totalbones, NumRawFrames)
+    Action_List = psa_anim.actions
 
     #==============================================================================================
-    # Raw keys (VQuatAnimKey) 3f vec, 4f quat, 1f time
+    # Raw keys (VQuatAnimKey) and raw scale keys (VScaleAnimKey), shared read-only with the cache
     #==============================================================================================
-    read_chunk()
+    Raw_Keys = psa_anim.raw_keys
+    Raw_ScaleKeys = psa_anim.raw_scale_keys
 
-    if(Raw_Key_Nums != chunk_datacount):
-        error_callback(
-                'Raw_Key_Nums Inconsistent.'
-                '\nData count found: '+chunk_datacount+
-                '\nRaw_Key_Nums:' + Raw_Key_Nums
-                )
-        return False
-
-    Raw_Key_List = [None] * chunk_datacount
-
-    unpack_data = Struct('3f4f4x').unpack_from
-
-    for counter in range(chunk_datacount):
-        pos = Vector()
-        quat = Quaternion()
-
-        ( pos.x,  pos.y,  pos.z,
-         quat.x, quat.y, quat.z, quat.w
-        ) = unpack_data( chunk_data, chunk_datasize * counter)
-
-        if bScaleDown:
-            Raw_Key_List[counter] = (pos * 0.01, quat)
-        else:
-            Raw_Key_List[counter] = (pos, quat)
-
-    #============================================================================================== 
-    # Raw scale keys (VScaleAnimKey) 3f vec, 1f time
-    #============================================================================================== 
-    curr_pos = psafile.tell() # save current position
-    psafile.seek(0, 2) # seek to end
-
-    if (curr_pos != psafile.tell()): # make sure not eof
-        psafile.seek(curr_pos) # seek back to previous pos
-        read_chunk()
-
-        Raw_ScaleKey_List = [None] * chunk_datacount
-
-        unpack_data = Struct('3f4x').unpack_from
-
-        for counter in range(chunk_datacount):
-            scale = Vector()
-
-            (scale.x,  scale.y,  scale.z) = unpack_data( chunk_data, chunk_datasize * counter)
-
-            Raw_ScaleKey_List[counter] = scale
-
-
-
-    psafile.close()
+    #==============================================================================================
+    # Rest pose per psa bone, identity for the bones the armature doesn't have
+    #==============================================================================================
+    BoneFound = np.array([psa_bone is not None for psa_bone in PsaBonesToProcess], dtype = bool)
+    BonePostQuats = np.zeros((len(PsaBonesToProcess), 4), dtype = np.float32)
+    BonePostQuats[:, 0] = 1.0
+    BoneOrigQuats = BonePostQuats.copy()
+    BoneOrigLocs = np.zeros((len(PsaBonesToProcess), 3), dtype = np.float32)
+    BoneInvertKey = np.zeros(len(PsaBonesToProcess), dtype = bool)
+
+    for j, psa_bone in enumerate(PsaBonesToProcess):
+        if psa_bone is None:
+            continue
+        BonePostQuats[j] = psa_bone.post_quat
+        BoneOrigQuats[j] = psa_bone.orig_quat
+        BoneOrigLocs[j] = psa_bone.orig_loc
+        BoneInvertKey[j] = psa_bone.parent == None and bDontInvertRoot
+
+    # @
+    # orig_quat * post_quat
+    BoneRestQuats = util_rotate_quats(BonePostQuats, BoneOrigQuats)
+    BonePostQuatsConjugated = BonePostQuats * np.array((1.0, -1.0, -1.0, -1.0), dtype = np.float32)
+
+    # keyframe interpolation enum as the number foreach_set takes
+    interpolation_value = bpy.types.Keyframe.bl_rna.properties['interpolation'].enum_items[fcurve_interpolation].value
 
     utils_set_mode('OBJECT')
 
@@ -1613,7 +1507,7 @@ def psaimport(filepath,
 
     util_obj_set_active(context, armature_obj)
 
-    gen_name_part = util_gen_name_part(filepath)
+    gen_name_part = util_gen_name_part(psa_anim.filepath)
 
     armature_obj.animation_data_create()
 
@@ -1678,7 +1572,7 @@ def psaimport(filepath,
                 psa_bone.fcurve_loc_y = action.fcurves.new(data_path, index = 1)
                 psa_bone.fcurve_loc_z = action.fcurves.new(data_path, index = 2)
 
-            if Raw_ScaleKey_List:
+            if Raw_ScaleKeys is not None:
                 data_path = pose_bone.path_from_id("scale")
                 psa_bone.fcurve_scale_x = action.fcurves.new(data_path, index = 0)
                 psa_bone.fcurve_scale_y = action.fcurves.new(data_path, index = 1)
@@ -1708,130 +1602,79 @@ def psaimport(filepath,
                 psa_bone.fcurve_loc_y.keyframe_points.add(keyframes)
                 psa_bone.fcurve_loc_z.keyframe_points.add(keyframes)
 
-        for i in range(0,min(maxframes, NumRawFrames)):
-            # raw_key_index+= Totalbones * 5 #55
-            for j in range(Totalbones):
-                if j in BoneNotFoundList:
-                    raw_key_index += 1
-                    continue
-
-                psa_bone = PsaBonesToProcess[j]
-                # pose_bone = psa_bone.pose_bone
-
-                p_pos = Raw_Key_List[raw_key_index][0]
-                p_quat = Raw_Key_List[raw_key_index][1]
+        frames = min(maxframes, NumRawFrames)
+        keyframe_interpolations = np.full(frames, interpolation_value, dtype = np.int32)
+        action_keys = slice(raw_key_index, raw_key_index + NumRawFrames * Totalbones)
 
-                # @
-                # if psa_bone.parent:
-                    # quat = (p_quat * psa_bone.post_quat).conjugated() * (psa_bone.orig_quat * psa_bone.post_quat)
-                # else:
-                #     if bDontInvertRoot:
-                #         quat = (p_quat.conjugated() * psa_bone.post_quat).conjugated() * (psa_bone.orig_quat * psa_bone.post_quat)
-                #     else:
-                        # quat = (p_quat * psa_bone.post_quat).conjugated() * (psa_bone.orig_quat * psa_bone.post_quat)
-
-                q = psa_bone.post_quat.copy()
-                q.rotate( psa_bone.orig_quat )
-
-                quat = q
+        # bones with keys in this action, found in the armature
+        bones = np.flatnonzero(BoneFound[:Totalbones])
+        key_bones = np.tile(bones, frames)
 
-                q = psa_bone.post_quat.copy()
-
-                if psa_bone.parent == None and bDontInvertRoot:
-                    q.rotate( p_quat.conjugated() )
-                else:
-                    q.rotate( p_quat )
+        # (frames, bones, 7) -> keys of the found bones, frame by frame
+        keys = Raw_Keys[action_keys].reshape(NumRawFrames, Totalbones, 7)[:frames, bones].reshape(-1, 7)
 
-                quat.rotate( q.conjugated() )
+        if bScaleDown:
+            # in float, like Vector * 0.01
+            keys[:, :3] *= np.float32(0.01)
 
-                # @
-                # loc = psa_bone.post_quat.conjugated() * p_pos -  psa_bone.post_quat.conjugated() * psa_bone.orig_loc
-
-                if not bRotationOnly:
-                    loc = (p_pos - psa_bone.orig_loc)
-                    # "edit bone" location is in "parent space"
-                    # but "pose bone" location is in "local space(bone)"
-                    # so we need to transform from parent(edit_bone) to local space (pose_bone)
-                    loc.rotate( psa_bone.post_quat.conjugated() )
-
-                # if not bRotationOnly:
-                    # loc = (p_pos - psa_bone.orig_loc)
-                    # if psa_bone.parent is not None:
-                        # q = psa_bone.parent.post_quat.copy()
-                        # q.rotate( psa_bone.parent.orig_quat )
-                        # print(q)
-                        # loc.rotate( psa_bone.parent.post_quat.conjugated() )
-                        # loc.rotate( q.conjugated() )
-                        # loc.rotate( q )
-                        # pass
-
-                # quat = p_quat.conjugated()
-                # quat = p_quat
-                # quat.rotate( psa_bone.orig_quat.conjugated() )
-                # quat = Quaternion()
-                # loc = -p_pos
-                # loc = (p_pos - psa_bone.orig_loc)
-                # loc = Vector()
-                # loc.rotate( psa_bone.post_quat.conjugated() )
-
-                # Set it?
-                # pose_bone.rotation_quaternion = quat
-                # pose_bone.location = loc
-
-                    # pose_bone.rotation_quaternion = orig_rot.conjugated()
-                    # pose_bone.location = p_pos - (pose_bone.bone.matrix_local.translation - pose_bone.bone.parent.matrix_local.translation)
-
-                ##### Works + post_quat (without location works)
+        # @
+        # if psa_bone.parent:
+            # quat = (p_quat * psa_bone.post_quat).conjugated() * (psa_bone.orig_quat * psa_bone.post_quat)
+        # else:
+        #     if bDontInvertRoot:
+        #         quat = (p_quat.conjugated() * psa_bone.post_quat).conjugated() * (psa_bone.orig_quat * psa_bone.post_quat)
+        #     else:
                 # quat = (p_quat * psa_bone.post_quat).conjugated() * (psa_bone.orig_quat * psa_bone.post_quat)
-                # loc = psa_bone.post_quat.conjugated() * (p_pos - psa_bone.orig_loc)
-
-
-                psa_bone.fcurve_quat_w.keyframe_points[i].co = i, quat.w
-                psa_bone.fcurve_quat_x.keyframe_points[i].co = i, quat.x
-                psa_bone.fcurve_quat_y.keyframe_points[i].co = i, quat.y
-                psa_bone.fcurve_quat_z.keyframe_points[i].co = i, quat.z
+        p_quats = keys[:, 3:]
+        p_quats[BoneInvertKey[key_bones], 1:] *= -1
 
-                psa_bone.fcurve_quat_w.keyframe_points[i].interpolation = fcurve_interpolation
-                psa_bone.fcurve_quat_x.keyframe_points[i].interpolation = fcurve_interpolation
-                psa_bone.fcurve_quat_y.keyframe_points[i].interpolation = fcurve_interpolation
-                psa_bone.fcurve_quat_z.keyframe_points[i].interpolation = fcurve_interpolation
+        q = util_rotate_quats(BonePostQuats[key_bones], p_quats)
+        q[:, 1:] *= -1
 
+        Quats = util_rotate_quats(BoneRestQuats[key_bones], q).reshape(frames, len(bones), 4)
 
-                if not bRotationOnly:
-                    psa_bone.fcurve_loc_x.keyframe_points[i].co = i, loc.x
-                    psa_bone.fcurve_loc_y.keyframe_points[i].co = i, loc.y
-                    psa_bone.fcurve_loc_z.keyframe_points[i].co = i, loc.z
+        # @
+        # loc = psa_bone.post_quat.conjugated() * p_pos -  psa_bone.post_quat.conjugated() * psa_bone.orig_loc
+        if not bRotationOnly:
+            # "edit bone" location is in "parent space"
+            # but "pose bone" location is in "local space(bone)"
+            # so we need to transform from parent(edit_bone) to local space (pose_bone)
+            Locs = util_rotate_vecs(BonePostQuatsConjugated[key_bones], keys[:, :3] - BoneOrigLocs[key_bones])
+            Locs = Locs.reshape(frames, len(bones), 3)
 
-                    psa_bone.fcurve_loc_x.keyframe_points[i].interpolation = fcurve_interpolation
-                    psa_bone.fcurve_loc_y.keyframe_points[i].interpolation = fcurve_interpolation
-                    psa_bone.fcurve_loc_z.keyframe_points[i].interpolation = fcurve_interpolation
+        if Raw_ScaleKeys is not None:
+            Scales = Raw_ScaleKeys[action_keys].reshape(NumRawFrames, Totalbones, 3)[:frames, bones]
 
-                if Raw_ScaleKey_List:
-                    scale = Raw_ScaleKey_List[raw_key_index]
+        # (frame, value) per keyframe, the values are filled per F-curve
+        keyframe_co = np.empty((frames, 2), dtype = np.float32)
+        keyframe_co[:, 0] = np.arange(frames)
 
-                    psa_bone.fcurve_scale_x.keyframe_points[i].co = i, scale.x
-                    psa_bone.fcurve_scale_y.keyframe_points[i].co = i, scale.y
-                    psa_bone.fcurve_scale_z.keyframe_points[i].co = i, scale.z
+        def set_keyframes(fcurve, values):
+            keyframe_co[:, 1] = values
+            fcurve.keyframe_points.foreach_set("co", keyframe_co.ravel())
+            fcurve.keyframe_points.foreach_set("interpolation", keyframe_interpolations)
+            # "Apply" data, see above
+            fcurve.update()
 
-                    psa_bone.fcurve_scale_x.keyframe_points[i].interpolation = fcurve_interpolation
-                    psa_bone.fcurve_scale_y.keyframe_points[i].interpolation = fcurve_interpolation
-                    psa_bone.fcurve_scale_z.keyframe_points[i].interpolation = fcurve_interpolation
+        for k, j in enumerate(bones.tolist()):
+            psa_bone = PsaBonesToProcess[j]
 
+            set_keyframes(psa_bone.fcurve_quat_w, Quats[:, k, 0])
+            set_keyframes(psa_bone.fcurve_quat_x, Quats[:, k, 1])
+            set_keyframes(psa_bone.fcurve_quat_y, Quats[:, k, 2])
+            set_keyframes(psa_bone.fcurve_quat_z, Quats[:, k, 3])
 
-                # Old path. Slower.
-                # psa_bone.fcurve_quat_w.keyframe_points.insert(i,quat.w,{'NEEDED','FAST'}).interpolation = fcurve_interpolation
-                # psa_bone.fcurve_quat_x.keyframe_points.insert(i,quat.x,{'NEEDED','FAST'}).interpolation = fcurve_interpolation
-                # psa_bone.fcurve_quat_y.keyframe_points.insert(i,quat.y,{'NEEDED','FAST'}).interpolation = fcurve_interpolation
-                # psa_bone.fcurve_quat_z.keyframe_points.insert(i,quat.z,{'NEEDED','FAST'}).interpolation = fcurve_interpolation
+            if not bRotationOnly:
+                set_keyframes(psa_bone.fcurve_loc_x, Locs[:, k, 0])
+                set_keyframes(psa_bone.fcurve_loc_y, Locs[:, k, 1])
+                set_keyframes(psa_bone.fcurve_loc_z, Locs[:, k, 2])
 
-                # psa_bone.fcurve_loc_x.keyframe_points.insert(i,loc.x,{'NEEDED','FAST'}).interpolation = fcurve_interpolation
-                # psa_bone.fcurve_loc_y.keyframe_points.insert(i,loc.y,{'NEEDED','FAST'}).interpolation = fcurve_interpolation
-                # psa_bone.fcurve_loc_z.keyframe_points.insert(i,loc.z,{'NEEDED','FAST'}).interpolation = fcurve_interpolation
-                raw_key_index += 1
+            if Raw_ScaleKeys is not None:
+                set_keyframes(psa_bone.fcurve_scale_x, Scales[:, k, 0])
+                set_keyframes(psa_bone.fcurve_scale_y, Scales[:, k, 1])
+                set_keyframes(psa_bone.fcurve_scale_z, Scales[:, k, 2])
 
-            # on first frame
-            # break
-        raw_key_index += (NumRawFrames-min(maxframes,NumRawFrames)) * Totalbones
+        raw_key_index += NumRawFrames * Totalbones
 
         # Add action to tail of the nla track
         if bActionsToTrack:
@@ -1994,6 +1837,16 @@ class ImportProps():
             description = "Apply 'linear RGB -> sRGB' conversion over vertex colors",
             default = True,
             )
+    iMaxInfluences : IntProperty(
+            name = "Max influences",
+            description = "Keep only this many strongest bone influences per vertex and renormalize their weights.\n * 0 - no limit.",
+            default = 0, min = 0, max = 8,
+            )
+    bImportMorphs : BoolProperty(
+            name = "Import morph targets",
+            description = "Import morph targets as shape keys.",
+            default = True,
+            )
 
     def draw_psk(self, context):
         props = bpy.context.scene.pskpsa_import
@@ -2015,6 +1868,8 @@ class ImportProps():
 
         layout.prop(props, 'bScaleDown')
         layout.prop(props, 'bToSRGB')
+        layout.prop(props, 'iMaxInfluences')
+        layout.prop(props, 'bImportMorphs')
         layout.prop(props, 'fBonesizeRatio')
         layout.prop(props, 'fBonesize')
 
@@ -2119,6 +1974,7 @@ class IMPORT_OT_psk(bpy.types.Operator, ImportProps):
             keywords = self.as_keywords(
                 ignore=(
                     "import_mode",
+                    "bImportMorphs",
                     "filter_glob",
                     "bFilenameAsPrefix",
                     "bActionsToTrack",
@@ -2142,6 +1998,7 @@ class IMPORT_OT_psk(bpy.types.Operator, ImportProps):
             # ugly workaround
             keywords["bImportbone"] = bImportbone
             keywords["bImportmesh"] = bImportmesh
+            keywords["morph_names"] = None if self.bImportMorphs else ()
 
             no_errors = pskimport( **keywords )
 
@@ -2173,6 +2030,8 @@ class IMPORT_OT_psk(bpy.types.Operator, ImportProps):
                             bDontInvertRoot = props.bDontInvertRoot,
                             bScaleDown = props.bScaleDown,
                             bToSRGB = props.bToSRGB,
+                            iMaxInfluences = props.iMaxInfluences,
+                            morph_names = None if props.bImportMorphs else (),
                             error_callback = util_ui_show_msg
                             )
 
@@ -2224,6 +2083,8 @@ class IMPORT_OT_psa(bpy.types.Operator, ImportProps):
                     "bReorientBones",
                     "bReorientDirectly",
                     "bToSRGB",
+                    "iMaxInfluences",
+                    "bImportMorphs",
                     "filter_glob",
                     "files",
                     "directory"
@@ -0,0 +1,376 @@
+"""
+Decoder for Unreal skeletal mesh (.psk/.pskx) and animation set (.psa) files.
+
+Only depends on numpy, so it can be used outside of Blender to parse files in worker processes,
+cache the results or benchmark the parser:
+
+    python unreal_psk_psa_decoder.py Body.psk Emote.psa
+
+Every chunk is decoded into numpy arrays that share memory with a read-only mapping of the file,
+scaling and axis conversion are left to the caller. When only some chunks are asked for, those are
+read on their own and the rest of the file is skipped.
+"""
+
+# https://github.com/gildor2/UModel/blob/master/Exporters/Psk.h
+
+import mmap
+import os
+import sys
+import time
+from struct import unpack_from
+
+import numpy as np
+
+PSK_HEADER = b'ACTRHEAD\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'
+PSA_HEADER = b'ANIMHEAD\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'
+
+CHUNK_HEADER_SIZE = 32
+
+# Chunk records as numpy dtypes. The record size written in the chunk header wins,
+# chunk_array() pads these to it.
+PSK_MATERIAL = np.dtype([('name', 'S64')])
+PSK_VERTEX = np.dtype([('co', '<f4', (3,))])
+PSK_WEDGE = np.dtype([('point_index', '<u4'), ('uv', '<f4', (2,)), ('material_index', 'u1')])
+PSK_FACE = np.dtype([('wedge_index', '<u2', (3,)), ('material_index', 'u1'), ('aux_material_index', 'u1'), ('smoothing_group', '<u4')])
+PSK_FACE32 = np.dtype([('wedge_index', '<u4', (3,)), ('material_index', 'u1'), ('aux_material_index', 'u1'), ('smoothing_group', '<u4')])
+PSK_BONE = np.dtype([('name', 'S64'), ('flags', '<i4'), ('num_children', '<i4'), ('parent_index', '<i4'), ('quat', '<f4', (4,)), ('loc', '<f4', (3,))])
+PSK_WEIGHT = np.dtype([('weight', '<f4'), ('point_index', '<i4'), ('bone_index', '<i4')])
+PSK_VERTEX_COLOR = np.dtype([('color', 'u1', (4,))])
+PSK_EXTRA_UV = np.dtype([('uv', '<f4', (2,))])
+PSK_NORMAL = np.dtype([('normal', '<f4', (3,))])
+PSK_MORPH_INFO = np.dtype([('name', 'S64'), ('vertex_count', '<i4')])
+PSK_MORPH_DATA = np.dtype([('position_delta', '<f4', (3,)), ('normal_delta', '<f4', (3,)), ('point_index', '<i4')])
+
+# chunks needed to build only the armature of a psk
+PSK_SKELETON_CHUNKS = frozenset(('REFSKELT', 'REFSKEL0'))
+
+PSA_BONE = np.dtype([('name', 'S64')])
+PSA_ACTION = np.dtype([('name', 'S64'), ('group', 'S64'), ('total_bones', '<i4'), ('root_include', '<i4'),
+                       ('key_compression_style', '<i4'), ('key_quotum', '<i4'), ('key_reduction', '<f4'),
+                       ('track_time', '<f4'), ('anim_rate', '<f4'), ('start_bone', '<i4'),
+                       ('first_raw_frame', '<i4'), ('num_raw_frames', '<i4')])
+PSA_KEY = np.dtype([('position', '<f4', (3,)), ('orientation', '<f4', (4,)), ('time', '<f4')])
+PSA_SCALE_KEY = np.dtype([('scale', '<f4', (3,)), ('time', '<f4')])
+
+
+class DecodeError(Exception):
+    pass
+
+
+class PskData:
+    """Mesh and skeleton of a .psk file, the arrays are None for chunks the file does not have"""
+
+    def __init__(self):
+        # (n, 3) float32
+        self.vertices = None
+        # PSK_WEDGE records
+        self.wedges = None
+        # (n, 3) wedge indices and material index per face
+        self.face_wedges = None
+        self.face_materials = None
+        self.materials = []
+        # PSK_BONE records and their decoded names
+        self.bones = None
+        self.bone_names = []
+        # PSK_WEIGHT records
+        self.weights = None
+        # (wedges, 4) uint8
+        self.vertex_colors = None
+        # (wedges, 2) float32 per extra UV channel
+        self.extra_uvs = []
+        # (n, 3) float32
+        self.normals = None
+        self.morph_names = []
+        self.morph_vertex_counts = None
+        # PSK_MORPH_DATA records of all morphs, one after the other
+        self.morph_deltas = None
+
+
+class PsaData:
+    """Bones, actions and raw keys of a .psa file"""
+
+    def __init__(self):
+        self.bone_names = []
+        # PSA_ACTION records and their decoded names
+        self.actions = None
+        self.action_names = []
+        self.action_groups = []
+        # PSA_KEY records, frame after frame of every action with total_bones keys each
+        self.keys = None
+        # PSA_SCALE_KEY records matching keys, None if the file has no scale keys
+        self.scale_keys = None
+
+
+# since names have type ANSICHAR(signed char) - using cp1251(or 'ASCII'?)
+def bytes_to_str(in_bytes):
+    return in_bytes.rstrip(b'\x00').decode(encoding = 'cp1252', errors = 'replace')
+
+
+def map_file(file):
+    '''Map an open file read-only. Slices of the returned memoryview share the mapping,
+    which goes away with the last of them, so the file itself can be closed right away.'''
+    return memoryview(mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ))
+
+
+def read_chunk(data, offset):
+    '''Read the chunk at offset of a mapped psk/psa file.
+    Return (chunk_id, chunk_type, chunk_datasize, chunk_datacount, chunk_data, next_offset).
+    chunk_data is a slice of data, shorter than chunk_datasize * chunk_datacount if the file is cut off.'''
+    #         VChunkHeader Struct
+    # ChunkID|TypeFlag|DataSize|DataCount
+    # 0      |1       |2       |3
+    (chunk_id, chunk_type, chunk_datasize, chunk_datacount) = unpack_from('20s3i', data, offset)
+
+    offset += CHUNK_HEADER_SIZE
+    next_offset = offset + chunk_datasize * chunk_datacount
+
+    return (chunk_id, chunk_type, chunk_datasize, chunk_datacount, data[offset:next_offset], next_offset)
+
+
+def chunk_array(chunk_data, chunk_datasize, chunk_datacount, dtype):
+    '''Return the chunk records as a structured array that shares memory with chunk_data.
+    Raises ValueError if the records are smaller than dtype.'''
+    fields = dtype.fields
+    record = np.dtype({
+        'names': dtype.names,
+        'formats': [fields[name][0] for name in dtype.names],
+        'offsets': [fields[name][1] for name in dtype.names],
+        'itemsize': chunk_datasize
+    })
+    return np.frombuffer(chunk_data, record, chunk_datacount)
+
+
+def iter_chunks(data, file_ext, warning_callback = print):
+    '''Yield (chunk_id, chunk_datasize, chunk_datacount, chunk_data) for every chunk after the file header.'''
+    offset = CHUNK_HEADER_SIZE
+
+    while offset < len(data):
+
+        if len(data) - offset < CHUNK_HEADER_SIZE:
+            warning_callback("Unexpected end of file.(%s/32 bytes)" % (len(data) - offset))
+            return
+
+        (chunk_id, _, chunk_datasize, chunk_datacount, chunk_data, offset) = read_chunk(data, offset)
+
+        chunk_id = bytes_to_str(chunk_id)[:8]
+
+        if len(chunk_data) < chunk_datasize * chunk_datacount:
+            raise DecodeError('%s chunk %s is broken.' % (file_ext.capitalize(), chunk_id))
+
+        yield chunk_id, chunk_datasize, chunk_datacount, chunk_data
+
+
+def seek_chunks(file, file_ext, chunks, warning_callback = print):
+    '''Like iter_chunks, but read only the chunks with an id in chunks from an open file and seek past the others.'''
+    file_size = os.fstat(file.fileno()).st_size
+    offset = CHUNK_HEADER_SIZE
+
+    while offset < file_size:
+
+        file.seek(offset)
+        chunk_header = file.read(CHUNK_HEADER_SIZE)
+        if len(chunk_header) < CHUNK_HEADER_SIZE:
+            warning_callback("Unexpected end of file.(%s/32 bytes)" % len(chunk_header))
+            return
+
+        (chunk_id, _, chunk_datasize, chunk_datacount) = unpack_from('20s3i', chunk_header)
+        chunk_id = bytes_to_str(chunk_id)[:8]
+        offset += CHUNK_HEADER_SIZE + chunk_datasize * chunk_datacount
+
+        if chunk_id not in chunks:
+            continue
+
+        chunk_data = file.read(chunk_datasize * chunk_datacount)
+        if len(chunk_data) < chunk_datasize * chunk_datacount:
+            raise DecodeError('%s chunk %s is broken.' % (file_ext.capitalize(), chunk_id))
+
+        yield chunk_id, chunk_datasize, chunk_datacount, chunk_data
+
+
+def check_header(file, filepath, file_ext, header):
+    header_bytes = file.read(CHUNK_HEADER_SIZE)
+
+    if len(header_bytes) < CHUNK_HEADER_SIZE or not header_bytes.startswith(header):
+        raise DecodeError('Not %s file:\n  "%s"' % (file_ext, filepath))
+
+
+def open_mapped(filepath, file_ext, header):
+    '''Map filepath after checking its file header. Raises OSError if it cannot be opened.'''
+    with open(filepath, 'rb') as file:
+        check_header(file, filepath, file_ext, header)
+
+        return map_file(file)
+
+
+def open_chunks(filepath, file_ext, header, warning_callback = print, chunks = None):
+    '''
+    Return the (chunk_id, chunk_datasize, chunk_datacount, chunk_data) of the chunks of filepath.
+
+    With chunks None the whole file is mapped. Otherwise only the chunks with an id in chunks are read,
+    the others are seeked past, so asking for a few small chunks of a big file costs only their size in I/O.
+    '''
+    if chunks is None:
+        return iter_chunks(open_mapped(filepath, file_ext, header), file_ext, warning_callback)
+
+    # unbuffered, to read no more than the chunk headers and the wanted chunks
+    with open(filepath, 'rb', buffering = 0) as file:
+        check_header(file, filepath, file_ext, header)
+
+        return list(seek_chunks(file, file_ext, chunks, warning_callback))
+
+
+def select_morphs(psk, morph_names):
+    '''Keep only the morphs of psk named in morph_names, compared case insensitively, and copy out their deltas.'''
+    wanted = {name.casefold() for name in morph_names}
+    keep = np.array([name.casefold() in wanted for name in psk.morph_names], dtype = bool)
+
+    if psk.morph_deltas is None or not keep.any():
+        psk.morph_names = []
+        psk.morph_vertex_counts = None
+        psk.morph_deltas = None
+        return
+
+    morph_ends = np.cumsum(psk.morph_vertex_counts).tolist()
+    morph_starts = [0] + morph_ends[:-1]
+    psk.morph_deltas = np.concatenate([psk.morph_deltas[start:end]
+            for start, end, kept in zip(morph_starts, morph_ends, keep.tolist()) if kept])
+    psk.morph_names = [name for name, kept in zip(psk.morph_names, keep.tolist()) if kept]
+    psk.morph_vertex_counts = psk.morph_vertex_counts[keep]
+
+
+def read_psk(filepath, warning_callback = print, morph_names = None, chunks = None):
+    '''
+    Decode a .psk/.pskx file into PskData. Raises DecodeError if it is not a valid psk file.
+
+    morph_names selects the morph targets to keep: None keeps all of them, otherwise only the named ones.
+    chunks is the set of chunk ids to read, e.g. PSK_SKELETON_CHUNKS, None reads them all.
+    '''
+    psk = PskData()
+
+    for chunk_id, chunk_datasize, chunk_datacount, chunk_data in open_chunks(filepath, 'psk', PSK_HEADER, warning_callback, chunks):
+
+        def read_array(dtype):
+            try:
+                return chunk_array(chunk_data, chunk_datasize, chunk_datacount, dtype)
+            except ValueError:
+                # records are smaller than the layout they have to hold
+                raise DecodeError('Psk chunk %s is broken.' % chunk_id)
+
+        if chunk_id == 'PNTS0000':
+            psk.vertices = read_array(PSK_VERTEX)['co']
+
+        elif chunk_id in ('VTXW0000', 'VTXW3200'):
+            psk.wedges = read_array(PSK_WEDGE)
+
+        elif chunk_id in ('FACE0000', 'FACE3200'):
+            # FACE3200 stores 32 bit wedge indices, written when there are more than 65536 wedges
+            faces = read_array(PSK_FACE32 if chunk_datasize >= PSK_FACE32.itemsize else PSK_FACE)
+            psk.face_wedges = faces['wedge_index']
+            psk.face_materials = faces['material_index']
+
+        elif chunk_id == 'MATT0000':
+            psk.materials = [bytes_to_str(name) for name in read_array(PSK_MATERIAL)['name'].tolist()]
+
+        elif chunk_id in ('REFSKELT', 'REFSKEL0'):
+            psk.bones = read_array(PSK_BONE)
+            psk.bone_names = [bytes_to_str(name) for name in psk.bones['name'].tolist()]
+
+        elif chunk_id in ('RAWW0000', 'RAWWEIGH'):
+            psk.weights = read_array(PSK_WEIGHT)
+
+        elif chunk_id == 'VERTEXCO':
+            psk.vertex_colors = read_array(PSK_VERTEX_COLOR)['color']
+
+        elif chunk_id == 'EXTRAUVS':
+            psk.extra_uvs.append(read_array(PSK_EXTRA_UV)['uv'])
+
+        elif chunk_id == 'VTXNORMS':
+            psk.normals = read_array(PSK_NORMAL)['normal']
+
+        elif chunk_id == 'MRPHINFO':
+            morph_infos = read_array(PSK_MORPH_INFO)
+            psk.morph_names = [bytes_to_str(name) for name in morph_infos['name'].tolist()]
+            psk.morph_vertex_counts = morph_infos['vertex_count']
+
+        elif chunk_id == 'MRPHDATA':
+            # no morph wanted, leave the biggest chunk of a face mesh untouched
+            if morph_names is None or morph_names:
+                psk.morph_deltas = read_array(PSK_MORPH_DATA)
+
+        else:
+            print('Unknown chunk: ', chunk_id)
+
+    if morph_names is not None:
+        select_morphs(psk, morph_names)
+
+    return psk
+
+
+def read_psa(filepath, warning_callback = print):
+    '''Decode a .psa file into PsaData. Raises DecodeError if it is not a valid psa file.'''
+    psa = PsaData()
+
+    for chunk_id, chunk_datasize, chunk_datacount, chunk_data in open_chunks(filepath, 'psa', PSA_HEADER, warning_callback):
+
+        def read_array(dtype):
+            try:
+                return chunk_array(chunk_data, chunk_datasize, chunk_datacount, dtype)
+            except ValueError:
+                raise DecodeError('Psa chunk %s is broken.' % chunk_id)
+
+        if chunk_id == 'BONENAME':
+            psa.bone_names = [bytes_to_str(name) for name in read_array(PSA_BONE)['name'].tolist()]
+
+        elif chunk_id == 'ANIMINFO':
+            psa.actions = read_array(PSA_ACTION)
+            psa.action_names = [bytes_to_str(name) for name in psa.actions['name'].tolist()]
+            psa.action_groups = [bytes_to_str(name) for name in psa.actions['group'].tolist()]
+
+        elif chunk_id == 'ANIMKEYS':
+            psa.keys = read_array(PSA_KEY)
+
+        elif chunk_id == 'SCALEKEY':
+            psa.scale_keys = read_array(PSA_SCALE_KEY)
+
+        else:
+            print('Unknown chunk: ', chunk_id)
+
+    if psa.actions is None or psa.keys is None:
+        raise DecodeError('Psa file has no animations:\n  "%s"' % filepath)
+
+    raw_key_nums = int(np.sum(psa.actions['total_bones'].astype(np.int64) * psa.actions['num_raw_frames']))
+
+    if raw_key_nums != len(psa.keys):
+        raise DecodeError(
+            'Raw_Key_Nums Inconsistent.'
+            '\nData count found: %s'
+            '\nRaw_Key_Nums: %s' % (len(psa.keys), raw_key_nums)
+        )
+
+    if psa.scale_keys is not None and len(psa.scale_keys) != len(psa.keys):
+        raise DecodeError('Psa chunk SCALEKEYS does not match ANIMKEYS.')
+
+    return psa
+
+
+def main():
+    def count(array):
+        return 0 if array is None else len(array)
+
+    for filepath in sys.argv[1:]:
+        start_time = time.perf_counter()
+
+        if filepath.lower().endswith('.psa'):
+            psa = read_psa(filepath)
+            print('%s: %i bones, %i actions, %i keys in %.2f ms' % (
+                filepath, len(psa.bone_names), len(psa.action_names), count(psa.keys),
+                (time.perf_counter() - start_time) * 1000))
+        else:
+            psk = read_psk(filepath)
+            print('%s: %i vertices, %i wedges, %i faces, %i bones, %i morphs in %.2f ms' % (
+                filepath, count(psk.vertices), count(psk.wedges), count(psk.face_wedges), len(psk.bone_names),
+                len(psk.morph_names), (time.perf_counter() - start_time) * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -18,6 +18,7 @@ os.system(f'dotnet publish -r win-x64 -o {release_folder} -c Release /p:PublishS
 with zipfile.ZipFile('Release/FortnitePortingServer.zip', 'w', zipfile.ZIP_DEFLATED) as server_zip:
     server_zip.write("Plugins/Blender/FortnitePortingServer.py", "FortnitePortingServer.py")
     server_zip.write("Plugins/Blender/io_import_scene_unreal_psa_psk_280.py", "io_import_scene_unreal_psa_psk_280.py")
+    server_zip.write("Plugins/Blender/unreal_psk_psa_decoder.py", "unreal_psk_psa_decoder.py")
     server_zip.write("Plugins/Blender/FortnitePortingData.blend", "FortnitePortingData.blend")
 
 with zipfile.ZipFile('Release/FortnitePorting.zip', 'w', zipfile.ZIP_DEFLATED) as main_zip: